@@ -9,10 +9,15 @@ from .models import (
     ArchiveSource,
     ArchiveTemplate,
     Forecast,
-    Archive
+    ForecastScrape,
+    Archive,
+    ScrapeRun,
+    TemplateRun
     )
 
 from zoneinfo import ZoneInfo
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django_admin_inline_paginator.admin import TabularInlinePaginated
 
@@ -174,7 +179,8 @@ class ForecastInline(TabularInlinePaginated):
 class ForecastTemplateAdmin(admin.ModelAdmin):
 
     list_display = (
-        'forecast_source', 'location', 'view_on_source_site', 'author')
+        'forecast_source', 'location', 'view_on_source_site', 'author',
+        'last_forecast', 'is_outdated')
     readonly_fields = (
         'forecast_source', 'location', 'view_on_source_site', 'author')
     fields = ('forecast_source', 'location', 'view_on_source_site', 'author')
@@ -183,6 +189,18 @@ class ForecastTemplateAdmin(admin.ModelAdmin):
 
     list_per_page = 15
 
+    def get_queryset(self, request):
+        return ForecastTemplate.with_last_forecast().select_related(
+            'location')
+
+    @admin.display(ordering='last_forecast')
+    def last_forecast(self, obj):
+        return obj.last_forecast
+
+    @admin.display(boolean=True, description='outdated')
+    def is_outdated(self, obj):
+        return obj.is_outdated()
+
     def view_on_source_site(self, obj):
 
         url = obj.url
@@ -302,3 +320,164 @@ class ForecastAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ForecastScrape)
+class ForecastScrapeAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'forecast_template', 'scraped_datetime', 'start_datetime', 'hours',
+        'parameters', 'data_size')
+    readonly_fields = list_display
+
+    fields = list_display
+
+    list_filter = ('forecast_template', 'scraped_datetime')
+
+    list_per_page = 15
+
+    @admin.display(description='Data, bytes')
+    def data_size(self, obj):
+        return len(obj.data)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+###############
+# SCRAPE RUNS #
+###############
+
+# Totals of template runs for aggregation
+RUN_TOTALS = {
+    'runs': Count('id'),
+    'failed': Count('id', filter=~Q(error='')),
+    'total_ms': Sum('total_ms'),
+    'fetch_ms': Sum('fetch_ms'),
+    'parse_ms': Sum('parse_ms'),
+    'write_ms': Sum('write_ms'),
+    'bytes_downloaded': Sum('bytes_downloaded'),
+    'records_written': Sum('records_written'),
+}
+
+
+class TemplateRunInline(TabularInlinePaginated):
+
+    model = TemplateRun
+    extra = 0
+    per_page = 50
+
+    fields = ('__str__', 'total_ms', 'fetch_ms', 'parse_ms', 'write_ms',
+              'bytes_downloaded', 'records_written', 'error')
+    readonly_fields = fields
+
+    ordering = ('-total_ms',)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ScrapeRun)
+class ScrapeRunAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'started', 'kind', 'duration', 'templates', 'failed', 'fetch_s',
+        'parse_s', 'write_s', 'downloaded_mb', 'records_written')
+    readonly_fields = (
+        'kind', 'started', 'finished', 'templates', 'failed')
+    fields = readonly_fields
+
+    list_filter = ('kind',)
+    date_hierarchy = 'started'
+
+    list_per_page = 30
+
+    inlines = [TemplateRunInline, ]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            fetch_ms=Sum('template_runs__fetch_ms'),
+            parse_ms=Sum('template_runs__parse_ms'),
+            write_ms=Sum('template_runs__write_ms'),
+            bytes_downloaded=Sum('template_runs__bytes_downloaded'),
+            records_written=Sum('template_runs__records_written'))
+
+    @admin.display(description='fetch, s', ordering='fetch_ms')
+    def fetch_s(self, obj):
+        return round((obj.fetch_ms or 0) / 1000, 1)
+
+    @admin.display(description='parse, s', ordering='parse_ms')
+    def parse_s(self, obj):
+        return round((obj.parse_ms or 0) / 1000, 1)
+
+    @admin.display(description='write, s', ordering='write_ms')
+    def write_s(self, obj):
+        return round((obj.write_ms or 0) / 1000, 1)
+
+    @admin.display(description='downloaded, MB',
+                   ordering='bytes_downloaded')
+    def downloaded_mb(self, obj):
+        return round((obj.bytes_downloaded or 0) / 2 ** 20, 2)
+
+    @admin.display(ordering='records_written')
+    def records_written(self, obj):
+        return obj.records_written
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TemplateRun)
+class TemplateRunAdmin(admin.ModelAdmin):
+    """Template runs with totals by source and location."""
+
+    change_list_template = 'admin/datascraper/templaterun/change_list.html'
+
+    list_display = (
+        'started', '__str__', 'total_ms', 'fetch_ms', 'parse_ms',
+        'write_ms', 'bytes_downloaded', 'records_written', 'error')
+
+    list_filter = (
+        'run__kind', 'forecast_template__forecast_source',
+        'archive_template__archive_source', 'error')
+    date_hierarchy = 'started'
+
+    list_per_page = 50
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'forecast_template__forecast_source',
+            'forecast_template__location',
+            'archive_template__archive_source',
+            'archive_template__location')
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            runs = response.context_data['cl'].queryset.order_by()
+        except (AttributeError, KeyError):
+            # Redirect of invalid filter
+            return response
+        response.context_data['totals'] = [
+            ('Source', runs.values(name=Coalesce(
+                'forecast_template__forecast_source__name',
+                'archive_template__archive_source__name')).annotate(
+                **RUN_TOTALS).order_by('-total_ms')),
+            ('Location', runs.values(name=Coalesce(
+                'forecast_template__location__name',
+                'archive_template__location__name')).annotate(
+                **RUN_TOTALS).order_by('-total_ms')[:20]),
+        ]
+        return response
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_add_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,14 @@
 # from selenium.webdriver.common.by import By
 from datascraper.forecasts import month_name_to_number, get_soup
+from datascraper.limiter import LIMITER
+from datascraper.fetcher import NETWORK_ERRORS
+from datascraper.breaker import retry
+from datascraper.metrics import PARSE_SECONDS
+from datascraper.tracing import span
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime, timedelta
+import contextvars
 import re
 
 
@@ -9,8 +17,32 @@ import re
 #############################
 
 
-def arch_rp5(start_datetime: datetime, url, end_datetime=None):
-    """Archive scraper function from RP5 source"""
+def archive_windows(start_datetime, end_datetime):
+    """ArchDate of every archive window from start_datetime back in past."""
+    windows, date_ = [], start_datetime
+    while date_ > end_datetime:
+        windows.append(date_.strftime("%d.%m.%Y"))
+        date_ -= timedelta(days=30)
+    return windows
+
+
+def scrap_window(url, payload, start_datetime):
+    """Scraping and parsing single archive window."""
+    soup = retry(get_soup, url, payload, attempts=2,
+                 exceptions=NETWORK_ERRORS)
+    with PARSE_SECONDS.time(scraper='arch_rp5'), \
+            span('parse', scraper='arch_rp5'):
+        return list(parse_arch_rp5(soup, start_datetime))
+
+
+def arch_rp5(start_datetime: datetime, url, end_datetime=None, workers=None):
+    """Archive scraper generator from RP5 source.
+
+    Yields list of new records for every scraped page (archive window),
+    from start_datetime back in past to end_datetime. Windows are
+    requested concurrently, up to `workers` at a time (per-host
+    max_in_flight limit by default), and yielded in order.
+    """
 
     #  Default archive end in past 01.05.2023 00:00 local time
     if not end_datetime:
@@ -20,59 +52,78 @@ def arch_rp5(start_datetime: datetime, url, end_datetime=None):
     else:
         step_option = '1'  # 1 day
 
-    payload = {'pe': step_option}
-
-    # While cycle back in past to end_datetime.
-    arch_data, date_ = [], start_datetime
-    while date_ > end_datetime:
-
-        payload['ArchDate'] = date_.strftime("%d.%m.%Y")
-
-        # parsing archive table
-        soup = get_soup(url, payload)
-        atab = soup.find('table', id='archiveTable')
-
-        # Parsing start date from source html page
-        start_date_from_source = atab.find('td', class_='cl_dt').\
-            get_text().replace('г.', ' ').replace(',', ' ').split()[:-1]
-        start_date_from_source = start_datetime.replace(
-                year=int(start_date_from_source[0]),
-                month=month_name_to_number(start_date_from_source[2]),
-                day=int(start_date_from_source[1]),
-                hour=0)
-
-        atab = atab.find_all('tr')[1:]
-        atab = [row.find_all('td')[-29:] for row in atab]
-
-        datetime_ = start_date_from_source
-        prev_time = None
-        for i, row in enumerate(atab):
-
-            time = int(row[0].get_text())
-            datetime_ = datetime_.replace(hour=time)
-            # print('+', datetime_.isoformat())
-            # print(prev_time, time)
-            if i != 0 and prev_time < time:
-                datetime_ -= timedelta(days=1)
-            prev_time = time
-
-            # temp = float(row[1].find(
-            #     'div', class_='t_0 dfs').get_text())
-            temp = row[1].find('div', class_='t_0 dfs')
-            temp = float(temp.get_text()) if temp else None
-
-            press = row[2].find('div', class_='p_0 dfs')
-            press = float(press.get_text()) if press else None
-            wind_vel = row[7].find('div', class_='wv_0')
-            wind_vel = wind_vel.get_text() if wind_vel else None
-            wind_vel = int(re.findall(r'\d+', wind_vel)[0]) \
-                if wind_vel else 0
-            record = [datetime_, [temp, press, wind_vel]]
-            if record not in arch_data and datetime_ > end_datetime:
-                arch_data.append(record)
-
-        date_ -= timedelta(days=30)
-
-    # END While cycle
-
-    return arch_data
+    windows = archive_windows(start_datetime, end_datetime)
+    workers = workers or LIMITER.host_limiter(url).max_in_flight
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+
+    def submit():
+        payload = {'pe': step_option, 'ArchDate': windows.pop(0)}
+        # Executor threads see async engine of calling thread
+        pending.append(executor.submit(
+            contextvars.copy_context().run,
+            scrap_window, url, payload, start_datetime))
+
+    # Records are deduplicated by datetime across pages.
+    seen_datetimes = set()
+    try:
+        while windows and len(pending) < workers:
+            submit()
+
+        while pending:
+            records = pending.popleft().result()
+            if windows:
+                submit()
+
+            page_records = []
+            for record in records:
+                datetime_ = record[0]
+                if datetime_ > end_datetime and \
+                        datetime_ not in seen_datetimes:
+                    seen_datetimes.add(datetime_)
+                    page_records.append(record)
+
+            yield page_records
+    finally:
+        # Generator closed early, e.g. only first page needed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_arch_rp5(soup, start_datetime):
+    """Parsing records from RP5 archive page."""
+
+    atab = soup.find('table', id='archiveTable')
+
+    # Parsing start date from source html page
+    start_date_from_source = atab.find('td', class_='cl_dt').\
+        get_text().replace('г.', ' ').replace(',', ' ').split()[:-1]
+    start_date_from_source = start_datetime.replace(
+            year=int(start_date_from_source[0]),
+            month=month_name_to_number(start_date_from_source[2]),
+            day=int(start_date_from_source[1]),
+            hour=0)
+
+    atab = atab.find_all('tr')[1:]
+    atab = [row.find_all('td')[-29:] for row in atab]
+
+    datetime_ = start_date_from_source
+    prev_time = None
+    for i, row in enumerate(atab):
+
+        time = int(row[0].get_text())
+        datetime_ = datetime_.replace(hour=time)
+        if i != 0 and prev_time < time:
+            datetime_ -= timedelta(days=1)
+        prev_time = time
+
+        temp = row[1].find('div', class_='t_0 dfs')
+        temp = float(temp.get_text()) if temp else None
+
+        press = row[2].find('div', class_='p_0 dfs')
+        press = float(press.get_text()) if press else None
+        wind_vel = row[7].find('div', class_='wv_0')
+        wind_vel = wind_vel.get_text() if wind_vel else None
+        wind_vel = int(re.findall(r'\d+', wind_vel)[0]) \
+            if wind_vel else 0
+        yield [datetime_, [temp, press, wind_vel]]
@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+from datascraper.logging import init_logger
+
+LOGGER = init_logger('Circuit breaker')
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+
+class CircuitBreaker():
+    """Per-source circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures, so requests to
+    the source are skipped without waiting for timeouts. After
+    `reset_timeout` seconds single probe is allowed (half-open): success
+    closes the circuit, failure opens it again for doubled timeout, up
+    to `max_reset_timeout`.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=60,
+                 max_reset_timeout=900):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Whether request to source can be made now."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and \
+                    time.monotonic() - self.opened_at >= self.reset_timeout:
+                # The only probe request until it is finished
+                self.state = HALF_OPEN
+                return True
+            self.skipped += 1
+            return False
+
+    def success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                LOGGER.info(f"{self.name}: circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+
+    def failure(self):
+        with self.lock:
+            # Requests started before opening don't extend timeout
+            if self.state == OPEN:
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(
+                    self.reset_timeout * 2, self.max_reset_timeout)
+            elif self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            LOGGER.error(
+                f"{self.name}: circuit open for {self.reset_timeout} s "
+                f"after {self.failures} failures")
+
+
+class Breakers():
+    """Circuit breakers by source name."""
+
+    def __init__(self, **options):
+        self.options = options
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if not breaker:
+                breaker = CircuitBreaker(name, **self.options)
+                self.breakers[name] = breaker
+        return breaker
+
+    def reset(self):
+        with self.lock:
+            self.breakers = {}
+
+    def report(self):
+        """Sources with not closed circuit."""
+        return '\n'.join(
+            f"{b.name}: {b.state}, {b.failures} failures, "
+            f"{b.skipped} skipped"
+            for b in self.breakers.values() if b.state != CLOSED)
+
+
+BREAKERS = Breakers()
+
+
+def retry(func, *args, attempts=3, delay=1, max_delay=10,
+          exceptions=(Exception,), **kwargs):
+    """Call func, retrying on exceptions with exponential backoff."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except exceptions as e:
+            if attempt == attempts:
+                raise
+            wait = min(delay * 2 ** (attempt - 1), max_delay)
+            LOGGER.debug(f"{getattr(func, '__name__', func)}: {e}, "
+                         f"retry {attempt} in {wait:.1f} s")
+            # Jitter, so retries of parallel scrapers don't coincide
+            time.sleep(wait * random.uniform(0.5, 1))
@@ -0,0 +1,271 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from random import choice
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import aiohttp
+from fake_useragent import UserAgent
+from datascraper.proxy import load_proxy_pool, proxy_url, BANNED_STATUSES
+from datascraper.limiter import LIMITER
+from datascraper.metrics import FETCH_SECONDS, FETCH_BYTES, add_stat
+
+PROXY_POOL = load_proxy_pool()
+
+# Downloaded page with validators for conditional requests
+Page = namedtuple('Page', ['status', 'text', 'etag', 'last_modified'])
+
+# Errors of synchronous and async requests, worth retrying
+NETWORK_ERRORS = (
+    requests.RequestException, aiohttp.ClientError, TimeoutError)
+
+
+###############
+# HTTP CLIENT #
+###############
+
+class Fetcher():
+    """Pooled HTTP client shared by all scrapers.
+
+    Keeps one keep-alive Session per host, so repeated requests to the
+    same source reuse TCP/TLS connections. User agents are taken from
+    a pool generated once per process. Every request waits for a slot
+    of per-host politeness limiter and goes through the healthiest proxy
+    of proxy pool.
+    """
+
+    def __init__(self, proxy_pool=None, timeout=10, pool_maxsize=10,
+                 user_agents_number=50, limiter=LIMITER):
+        self.proxy_pool = proxy_pool
+        self.limiter = limiter
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.user_agents_number = user_agents_number
+        self.sessions = {}
+        self.user_agents = []
+        self.lock = threading.Lock()
+
+    def choose_proxy(self):
+        return self.proxy_pool.choose() if self.proxy_pool else None
+
+    @contextmanager
+    def track(self, proxy):
+        """Measure request through proxy for proxy pool stats."""
+        if proxy is None:
+            yield SimpleNamespace(error=False)
+            return
+        with self.proxy_pool.track(proxy) as result:
+            yield result
+
+    def get_session(self, url):
+        """Return keep-alive Session for url host, create if not exists."""
+        host = urlsplit(url).netloc
+        with self.lock:
+            session = self.sessions.get(host)
+            if not session:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'Accept': '*/*'})
+                self.sessions[host] = session
+        return session
+
+    def user_agent(self):
+        """Random user agent from pre-warmed pool."""
+        with self.lock:
+            if not self.user_agents:
+                user_agent = UserAgent()
+                self.user_agents = [
+                    user_agent.random for _ in range(self.user_agents_number)]
+        return choice(self.user_agents)
+
+    def fetch(self, url, data=None, headers=None):
+        """GET url, or POST if data is passed. Returns Response."""
+        session = self.get_session(url)
+        headers = {'User-Agent': self.user_agent(), **(headers or {})}
+        proxy = self.choose_proxy()
+        proxies = {'https': proxy_url(proxy)} if proxy else None
+        with self.limiter.slot(url), self.track(proxy) as result, \
+                FETCH_SECONDS.time(host=urlsplit(url).hostname):
+            if data is None:
+                response = session.get(
+                    url, headers=headers, proxies=proxies,
+                    timeout=self.timeout)
+            else:
+                response = session.post(
+                    url, headers=headers, data=data, proxies=proxies,
+                    timeout=self.timeout)
+            result.error = response.status_code in BANNED_STATUSES
+        FETCH_BYTES.inc(len(response.content), host=urlsplit(url).hostname)
+        return response
+
+    def fetch_page(self, url, headers=None):
+        """GET url, returns Page."""
+        response = self.fetch(url, headers=headers)
+        return Page(
+            response.status_code, response.text,
+            response.headers.get('ETag', ''),
+            response.headers.get('Last-Modified', ''))
+
+    def close(self):
+        """Close all pooled connections."""
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+
+
+FETCHER = Fetcher(proxy_pool=PROXY_POOL)
+
+
+################
+# ASYNC ENGINE #
+################
+
+# Engine of running async scraper, visible in its executor threads
+ASYNC_ENGINE = contextvars.ContextVar('async_engine', default=None)
+
+
+class AsyncFetcher():
+    """asyncio fetch engine for async scraper runs.
+
+    Pages are downloaded in the event loop with a single aiohttp session,
+    so hundreds of requests can be in flight at once. Scrapers themselves
+    (and BeautifulSoup parsing) run in executor threads and send their
+    requests to the loop through fetch_threadsafe().
+    """
+
+    def __init__(self, fetcher=FETCHER, limit=100):
+        self.fetcher = fetcher
+        self.limit = limit
+        self.pages = {}
+        self.loop = None
+        self.session = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.limit),
+            timeout=aiohttp.ClientTimeout(total=self.fetcher.timeout),
+            headers={'Accept': '*/*'})
+        self.token = ASYNC_ENGINE.set(self)
+        return self
+
+    async def __aexit__(self, *args):
+        ASYNC_ENGINE.reset(self.token)
+        await self.session.close()
+
+    async def fetch_page(self, url, data=None, headers=None):
+        """GET url, or POST if data is passed. Returns Page."""
+        headers = {
+            'User-Agent': self.fetcher.user_agent(), **(headers or {})}
+        proxy = self.fetcher.choose_proxy()
+        method = 'GET' if data is None else 'POST'
+        async with self.fetcher.limiter.async_slot(url):
+            with self.fetcher.track(proxy) as result, \
+                    FETCH_SECONDS.time(host=urlsplit(url).hostname):
+                async with self.session.request(
+                        method, url, data=data, headers=headers,
+                        proxy=proxy_url(proxy) if proxy else None
+                ) as response:
+                    result.error = response.status in BANNED_STATUSES
+                    FETCH_BYTES.inc(len(await response.read()),
+                                    host=urlsplit(url).hostname)
+                    return Page(
+                        response.status, await response.text(),
+                        response.headers.get('ETag', ''),
+                        response.headers.get('Last-Modified', ''))
+
+    async def fetch(self, url, data=None, headers=None):
+        """GET url, or POST if data is passed. Returns page text."""
+        return (await self.fetch_page(url, data, headers)).text
+
+    async def prefetch(self, urls, headers=None):
+        """Download pages concurrently for later use by scrapers.
+
+        `headers` are optional request headers by url, e.g. validators
+        for conditional requests.
+        """
+        headers = headers or {}
+        pages = await asyncio.gather(
+            *(self.fetch_page(url, headers=headers.get(url)) for url in urls),
+            return_exceptions=True)
+        for url, page in zip(urls, pages):
+            # Failed pages will be requested again by scraper
+            if isinstance(page, Page):
+                self.pages[url] = page
+
+    def page_threadsafe(self, url, data=None, headers=None):
+        """Blocking fetch from executor thread through the event loop."""
+        start = time.perf_counter()
+        if data is None and url in self.pages:
+            page = self.pages.pop(url)
+        else:
+            page = asyncio.run_coroutine_threadsafe(
+                self.fetch_page(url, data, headers), self.loop).result()
+        # Page is downloaded in the event loop, outside of scraper context
+        add_stat('fetch', time.perf_counter() - start)
+        add_stat('bytes', len(page.text.encode()))
+        return page
+
+    def fetch_threadsafe(self, url, data=None, headers=None):
+        return self.page_threadsafe(url, data, headers).text
+
+
+async def run_in_threads(func, args, workers=10):
+    """Run blocking func for every arg in executor threads concurrently.
+
+    Executor is own for every call and is shut down at the end, so
+    default executor of the loop isn't replaced.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        # Threads run in copies of context, so they see ASYNC_ENGINE
+        return await asyncio.gather(
+            *(loop.run_in_executor(
+                executor, contextvars.copy_context().run, func, arg)
+              for arg in args),
+            return_exceptions=True)
+    finally:
+        # All calls are finished, threads are only joined
+        executor.shutdown()
+
+
+# Pages already downloaded in this thread, waiting for scraper
+LOCAL = threading.local()
+
+
+def fetch_page(url, headers=None, keep=False):
+    """Page from async engine if running, else from pooled fetcher.
+
+    With `keep` page text is served to the next fetch_text(url) call
+    in the same thread without downloading it again.
+    """
+    engine = ASYNC_ENGINE.get()
+    if engine:
+        page = engine.page_threadsafe(url, headers=headers)
+    else:
+        page = FETCHER.fetch_page(url, headers)
+    if keep and page.status == 200:
+        LOCAL.pages = {url: page.text}
+    return page
+
+
+def fetch_text(url, data=None, headers=None):
+    """Page text from async engine if running, else from pooled fetcher."""
+    pages = getattr(LOCAL, 'pages', {})
+    if data is None and url in pages:
+        return pages.pop(url)
+    engine = ASYNC_ENGINE.get()
+    if engine:
+        return engine.fetch_threadsafe(url, data, headers)
+    return FETCHER.fetch(url, data, headers).text
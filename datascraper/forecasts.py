@@ -1,21 +1,73 @@
 from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from lxml import etree
 from datetime import datetime, timedelta
-import time
 import re
-import requests
-from fake_useragent import UserAgent
+import hashlib
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions
+from selenium.common.exceptions import TimeoutException, WebDriverException
 # from selenium.webdriver.common.desired_capabilities
 # import DesiredCapabilities
 # from selenium_stealth import stealth
 import zipfile
-from datascraper.proxy import set_proxy
+import tempfile
+import threading
+import atexit
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from functools import lru_cache, partial
+from datascraper.fetcher import FETCHER, NETWORK_ERRORS, fetch_text
+from datascraper.breaker import retry
+from datascraper.limiter import LIMITER
+from datascraper.metrics import FETCH_SECONDS, FETCH_BYTES, PARSE_SECONDS
+from datascraper.recorder import FIXTURES
+from datascraper.tracing import span, traced
 from datascraper.logging import init_logger
 import os
 
-PROXY = set_proxy()
 SELENIUM_HOST = os.environ.get("SELENIUM_HOST")
+# Number of simultaneous browser sessions in Selenium container
+SELENIUM_POOL_SIZE = int(os.environ.get("SELENIUM_POOL_SIZE", 2))
+# Browser session is recycled after this number of pages
+SELENIUM_MAX_PAGES = int(os.environ.get("SELENIUM_MAX_PAGES", 50))
+# Parsing backend of scraper classes: "bs4" or "lxml"
+PARSER_BACKEND = os.environ.get("PARSER_BACKEND", "bs4")
+# Errors of source or browser, worth retrying
+TRANSIENT_ERRORS = NETWORK_ERRORS + (WebDriverException,)
+
+
+def has_class(class_):
+    """XPath predicate for css class, like BeautifulSoup class_ argument."""
+    if ' ' in class_:
+        # BeautifulSoup matches multi-valued class as exact string
+        return f'normalize-space(@class)="{class_}"'
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_} ")'
+
+
+def xpath_class(tag, class_):
+    """XPath for tag with css class, like BeautifulSoup find(tag, class_)."""
+    return f'//{tag}[{has_class(class_)}]'
+
+
+def xpaths(**paths):
+    """Compile XPath expressions once, relative to context element."""
+    return {name: etree.XPath(path) for name, path in paths.items()}
+
+
+def text(element):
+    """Text of lxml element, like BeautifulSoup get_text()."""
+    return element.text_content()
+
+
+def next_sibling_text(element):
+    """Text of next node, like BeautifulSoup next_sibling.get_text()."""
+    if element.tail:
+        return element.tail
+    return text(element.getnext())
 
 
 ####################################
@@ -25,17 +77,40 @@ SELENIUM_HOST = os.environ.get("SELENIUM_HOST")
 # table "datascraper_foreacstsource", column "scraper_class"
 
 class BaseForecastScraper():
-    """Base class for scrapers."""
+    """Base class for scrapers.
+
+    Every scraper class parses source page with two backends, giving
+    identical results: BeautifulSoup (parse_bs4) and faster raw lxml with
+    precompiled XPath (parse_lxml). Backend is selected by PARSER_BACKEND
+    or `backend` argument.
+    """
+
+    # Page rendered by Selenium, can't be prefetched by async engine
+    selenium = False
+    # XPath of page fragment with forecast table, for detecting changes
+    fragment = None
 
     def __init__(self, *args, **kwargs):
         self.local_datetime = kwargs["local_datetime"]
         self.start_forecast_datetime = kwargs["start_forecast_datetime"]
+        self.backend = kwargs.get("backend") or PARSER_BACKEND
         self.start_date_from_source = None
         self.time_row = []
         self.temp_row = []
         self.press_row = []
         self.wind_vel_row = []
 
+    def parse(self, src):
+        """Parsing source html page with selected backend."""
+        with PARSE_SECONDS.time(scraper=type(self).__name__), \
+                span('parse', scraper=type(self).__name__,
+                     backend=self.backend):
+            if self.backend == 'lxml':
+                self.parse_lxml(lxml_html.fromstring(src))
+            else:
+                self.parse_bs4(BeautifulSoup(src, "lxml"))
+
+    @traced('align')
     def get_forecasts(self):
         """Generating forecast records from scraped data."""
 
@@ -54,6 +129,17 @@ class BaseForecastScraper():
 
         return forecasts
 
+    @classmethod
+    def content_hash(cls, src):
+        """Hash of forecast table fragment of source html page."""
+        if not cls.fragment or not src:
+            return ''
+        fragment = lxml_html.fromstring(src).xpath(cls.fragment)
+        if not fragment:
+            return ''
+        return hashlib.sha256(
+            lxml_html.tostring(fragment[0], with_tail=False)).hexdigest()
+
     def get_start_date_from_source(self, month, day):
         """Calculate the starting date of the forecast source."""
         year = self.local_datetime.year
@@ -66,20 +152,40 @@ class BaseForecastScraper():
 class rp5(BaseForecastScraper):
     """https://rp5.ru/"""
 
+    fragment = '//*[@id="ftab_content"]'
+
+    xpath = xpaths(
+        ftab='//*[@id="ftab_content"]',
+        week_day=f'.//span[{has_class("weekDay")}]',
+        forecast_time=f'.//tr[{has_class("forecastTime")}]',
+        td='.//td',
+        temperature=f'.//a[{has_class("t_temperature")}]',
+        pressure=f'.//a[{has_class("t_pressure")}]',
+        wind_velocity=f'.//a[{has_class("t_wind_velocity")}]',
+        t_0=f'.//div[{has_class("t_0")}]',
+        p_0=f'.//div[{has_class("p_0")}]',
+        wv_0=f'.//div[{has_class("wv_0")}]',
+    )
+
     def __init__(self, url, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Scraping html content from source
-        soup = get_soup(url)
-        ftab = soup.find(id='ftab_content')
+        self.parse(get_html(url))
 
-        # Parsing start date from source html page
-        start_date_from_source = ftab.find(
-            'span', class_="weekDay").get_text().split(',')[-1].split()
+    def parse_start_date(self, week_day):
+        start_date_from_source = week_day.split(',')[-1].split()
         self.start_date_from_source = self.get_start_date_from_source(
             month=month_name_to_number(start_date_from_source[1][:3]),
             day=int(start_date_from_source[0])
         )
 
+    def parse_bs4(self, soup):
+        ftab = soup.find(id='ftab_content')
+
+        # Parsing start date from source html page
+        self.parse_start_date(
+            ftab.find('span', class_="weekDay").get_text())
+
         # Parsing time row from source
         time_row = ftab.find('tr', class_="forecastTime").find_all('td')[1:-1]
         self.time_row = [int(t.get_text()) for t in time_row]
@@ -104,42 +210,73 @@ class rp5(BaseForecastScraper):
 
         # TODO: ADD NEW PARAMETER HERE
 
+    def parse_lxml(self, tree):
+        xpath = self.xpath
+        ftab = xpath['ftab'](tree)[0]
+
+        # Parsing start date from source html page
+        self.parse_start_date(text(xpath['week_day'](ftab)[0]))
+
+        # Parsing time row from source
+        time_row = xpath['td'](xpath['forecast_time'](ftab)[0])[1:-1]
+        self.time_row = [int(text(t)) for t in time_row]
+
+        def row(name):
+            """Cells of table row with parameter name link."""
+            return xpath['td'](
+                xpath[name](ftab)[0].getparent().getparent())[1:-1]
+
+        # Parsing weather parameters rows from source:
+        # Temperature
+        self.temp_row = [
+            int(text(xpath['t_0'](t)[0])) for t in row('temperature')]
+        # Pressure
+        self.press_row = [
+            int(text(xpath['p_0'](t)[0])) for t in row('pressure')]
+        # Wind velocity
+        wind_vel_row = [xpath['wv_0'](w) for w in row('wind_velocity')]
+        self.wind_vel_row = [
+            int(text(w[0])) if w else 0 for w in wind_vel_row]
+
+        # TODO: ADD NEW PARAMETER HERE
+
 
 class yandex(BaseForecastScraper):
     """https://yandex.ru/pogoda"""
 
+    selenium = True
+
+    xpath = xpaths(
+        main='//main',
+        child_div='./div',
+        article='./article',
+        p='.//p',
+        span='.//span',
+        div='.//div',
+    )
+
     def __init__(self, url, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Scraping html content from source
-        attempt = 0
-        while attempt < 3:
-            try:
-                soup = get_soup_selenium(url)
-                ftab = soup.find('main').find_all('div', recursive=False)[1]
-            except AttributeError as e:
-                print(e)
-                time.sleep(1)
-                attempt += 1
-                continue
-            break
+        # Scraping html content from source,
+        # page is requested again if it is not rendered completely
+        retry(self.scrape, url, attempts=3, delay=1,
+              exceptions=(AttributeError, IndexError))
 
-        ftab = ftab.find_all('article', recursive=False)
+    def scrape(self, url):
+        self.parse(get_html_selenium(url, wait_for='main article'))
 
-        # Parsing start date from source html page
-        date_tags = ftab[0].find('p').find_all('span')
+    def parse_rows(self, date_texts, temp_row, press_row, wind_vel_row):
+        """Converting parsed texts to forecast rows."""
 
+        # Parsing start date from source html page
         self.start_date_from_source = self.get_start_date_from_source(
-            month=month_name_to_number(date_tags[2].get_text()),
-            day=int(date_tags[0].get_text())
+            month=month_name_to_number(date_texts[1]),
+            day=int(date_texts[0])
         )
 
-        ftab = [day.find_all('div', recursive=False)[:6*4] for day in ftab]
-        ftab = sum(ftab, [])
-
         # Parsing weather parameters rows from source:
         # Temperature
-        temp_row = [t.div.next_sibling for t in ftab[::6]]
         # Conversion of the temperature of the form "+6...+8"
         # to the average value
         temp_row = [t.replace(chr(8722), '-').replace('°', '').split('...')
@@ -148,10 +285,10 @@ class yandex(BaseForecastScraper):
         self.temp_row = [sum(t)/len(t) for t in temp_row]
 
         # Pressure
-        self.press_row = [int(p.get_text()) for p in ftab[2::6]]
+        self.press_row = [int(p) for p in press_row]
 
         # Wind velocity
-        wind_vel_row = [w.contents[0].replace(',', '.') for w in ftab[4::6]]
+        wind_vel_row = [w.replace(',', '.') for w in wind_vel_row]
         self.wind_vel_row = [float(w) for w in wind_vel_row]
 
         # Parsing time row from source
@@ -159,22 +296,62 @@ class yandex(BaseForecastScraper):
 
         # TODO: ADD NEW PARAMETER HERE
 
+    def parse_bs4(self, soup):
+        ftab = soup.find('main').find_all('div', recursive=False)[1]
+        ftab = ftab.find_all('article', recursive=False)
+
+        date_tags = ftab[0].find('p').find_all('span')
+
+        ftab = [day.find_all('div', recursive=False)[:6*4] for day in ftab]
+        ftab = sum(ftab, [])
+
+        self.parse_rows(
+            date_texts=[date_tags[0].get_text(), date_tags[2].get_text()],
+            temp_row=[t.div.next_sibling for t in ftab[::6]],
+            press_row=[p.get_text() for p in ftab[2::6]],
+            wind_vel_row=[w.contents[0] for w in ftab[4::6]])
+
+    def parse_lxml(self, tree):
+        xpath = self.xpath
+        ftab = xpath['child_div'](xpath['main'](tree)[0])[1]
+        ftab = xpath['article'](ftab)
+
+        date_tags = xpath['span'](xpath['p'](ftab[0])[0])
+
+        ftab = [xpath['child_div'](day)[:6*4] for day in ftab]
+        ftab = sum(ftab, [])
+
+        self.parse_rows(
+            date_texts=[text(date_tags[0]), text(date_tags[2])],
+            temp_row=[xpath['div'](t)[0].tail for t in ftab[::6]],
+            press_row=[text(p) for p in ftab[2::6]],
+            wind_vel_row=[w.text for w in ftab[4::6]])
+
 
 class meteoinfo(BaseForecastScraper):
     """https://meteoinfo.ru/forecasts/"""
 
+    fragment = xpath_class('div', 'hidden-desktop')
+
+    xpath = xpaths(
+        ftab=xpath_class('div', 'hidden-desktop'),
+        nobr='.//nobr',
+        temp=f'.//span[{has_class("fc_temp_short")}]',
+        i='.//i',
+    )
+
     def __init__(self, url, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Scraping html content from source
-        soup = get_soup(url)
-        ftab = soup.find('div', class_='hidden-desktop')
+        self.parse(get_html(url))
+
+    def parse_rows(self, start_date_from_source, start_hour, temp_row,
+                   wind_vel_row, press_row):
+        """Converting parsed texts to forecast rows."""
 
         # Parsing start date from source html page
-        start_date_from_source = ftab.find('nobr')
-        start_hour = start_date_from_source.parent.next_sibling.get_text()
         start_hour = 15 if start_hour.strip().lower() == 'день' else 3
-        start_date_from_source = start_date_from_source.get_text()
         self.start_date_from_source = self.get_start_date_from_source(
             month=month_name_to_number(start_date_from_source),
             day=int(re.findall(r'\d+', start_date_from_source)[0])
@@ -182,15 +359,11 @@ class meteoinfo(BaseForecastScraper):
 
         # Parsing weather parameters rows from source:
         # Temperature
-        temp_row = ftab.find_all('span', class_='fc_temp_short')
-        self.temp_row = [int(t.get_text().rstrip('°')) for t in temp_row]
+        self.temp_row = [int(t.rstrip('°')) for t in temp_row]
         # Wind velocity
-        wind_vel_row = ftab.find_all('i')
-        press_row = wind_vel_row[:]
-        self.wind_vel_row = [int(w.parent.get_text()) for w in wind_vel_row]
+        self.wind_vel_row = [int(w) for w in wind_vel_row]
         # Pressure
-        self.press_row = [
-            int(p.parent.next_sibling.get_text()) for p in press_row]
+        self.press_row = [int(p) for p in press_row]
 
         # Parsing time row from source
         time, self.time_row = start_hour, []
@@ -200,30 +373,92 @@ class meteoinfo(BaseForecastScraper):
 
         # TODO: ADD NEW PARAMETER HERE
 
+    def parse_bs4(self, soup):
+        ftab = soup.find('div', class_='hidden-desktop')
+
+        start_date_from_source = ftab.find('nobr')
+        wind_vel_row = ftab.find_all('i')
+
+        self.parse_rows(
+            start_date_from_source=start_date_from_source.get_text(),
+            start_hour=start_date_from_source.parent.next_sibling.get_text(),
+            temp_row=[t.get_text() for t in ftab.find_all(
+                'span', class_='fc_temp_short')],
+            wind_vel_row=[w.parent.get_text() for w in wind_vel_row],
+            press_row=[
+                p.parent.next_sibling.get_text() for p in wind_vel_row])
+
+    def parse_lxml(self, tree):
+        xpath = self.xpath
+        ftab = xpath['ftab'](tree)[0]
+
+        start_date_from_source = xpath['nobr'](ftab)[0]
+        wind_vel_row = xpath['i'](ftab)
+
+        self.parse_rows(
+            start_date_from_source=text(start_date_from_source),
+            start_hour=next_sibling_text(start_date_from_source.getparent()),
+            temp_row=[text(t) for t in xpath['temp'](ftab)],
+            wind_vel_row=[text(w.getparent()) for w in wind_vel_row],
+            press_row=[
+                next_sibling_text(p.getparent()) for p in wind_vel_row])
+
 
 class foreca(BaseForecastScraper):
     """https://www.foreca.ru/"""
 
+    # Forecasts of next days are on other pages, so changes of the first
+    # page don't show changes of forecasts: content hashing is off
+
+    xpath = xpaths(
+        ftab=xpath_class('div', 'page-content'),
+        date=f'.//div[{has_class("date")}]',
+        days_links=f'.//ul[{has_class("days")}]//a',
+        hour_container=f'.//div[{has_class("hourContainer")}]',
+        time_24h=f'.//span[{has_class("time_24h")}]',
+        temp_c=f'.//span[{has_class("t")}]'
+               f'/descendant::span[{has_class("temp_c")}][1]',
+        pres_mmhg=f'.//span[{has_class("value pres pres_mmhg")}]',
+        wind_ms=f'.//span[{has_class("windSpeed")}]'
+                f'/descendant::span[{has_class("value wind wind_ms")}][1]',
+    )
+
     def __init__(self, url, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Scraping html content from source first day page
-        soup = get_soup(url)
-
-        ftab = soup.find('div', class_='page-content')
+        self.url = url
+        self.parse(get_html(url))
 
-        # Parsing start date from source html page
-        start_date_from_source = ftab.find(
-            'div', class_='date').get_text().split()
+    def parse_start_date(self, date):
+        start_date_from_source = date.split()
         self.start_date_from_source = self.get_start_date_from_source(
             month=month_name_to_number(start_date_from_source[1][:3]),
             day=int(start_date_from_source[0])
         )
 
+    def next_days_urls(self, hrefs):
+        domain = self.url[:self.url.find('/', 8)]
+        return [domain + href for href in hrefs[1:]]
+
+    def extend_rows(self, time_row, temp_row, press_row, wind_vel_row):
+        self.time_row.extend([int(t) for t in time_row])
+        self.temp_row.extend([int(t) for t in temp_row])
+        self.press_row.extend([float(p) for p in press_row])
+        self.wind_vel_row.extend([int(w.split()[0]) for w in wind_vel_row])
+
+        # TODO: ADD NEW PARAMETER HERE
+
+    def parse_bs4(self, soup):
+        ftab = soup.find('div', class_='page-content')
+
+        # Parsing start date from source html page
+        self.parse_start_date(ftab.find('div', class_='date').get_text())
+
         # Parsing next days urls from source first day page
-        domain = url[:url.find('/', 8)]
-        next_days_urls = ftab.find('ul', class_='days').find_all('a')[1:]
-        next_days_urls = [domain + nd.get('href') for nd in next_days_urls]
+        next_days_urls = self.next_days_urls([
+            nd.get('href') for nd in ftab.find('ul', class_='days').
+            find_all('a')])
 
         # Scraping tables data to array
         ftabs = [ftab] + [get_soup(ndu).find(
@@ -231,29 +466,41 @@ class foreca(BaseForecastScraper):
 
         # Parsing from saved tables
         for ftab in ftabs:
-            # Parsing time row from source
             ftab = ftab.find('div', class_='hourContainer')
-            time_row = ftab.find_all('span', class_='time_24h')
-            time_row = [int(t.get_text()) for t in time_row]
-            self.time_row.extend(time_row)
-
-            # Parsing weather parameters rows from source pages:
-            # Temperature
-            temp_row = ftab.find_all('span', class_='t')
-            temp_row = [int(t.find('span', class_='temp_c').
-                            get_text()) for t in temp_row]
-            self.temp_row.extend(temp_row)
-            # Pressure
-            press_row = ftab.find_all('span', class_='value pres pres_mmhg')
-            press_row = [float(p.get_text()) for p in press_row]
-            self.press_row.extend(press_row)
-            # Wind velocity
-            wind_vel_row = ftab.find_all('span', class_='windSpeed')
-            wind_vel_row = [int(w.find('span', class_='value wind wind_ms').
-                                get_text().split()[0]) for w in wind_vel_row]
-            self.wind_vel_row.extend(wind_vel_row)
-
-            # TODO: ADD NEW PARAMETER HERE
+            self.extend_rows(
+                time_row=[t.get_text() for t in ftab.find_all(
+                    'span', class_='time_24h')],
+                temp_row=[t.find('span', class_='temp_c').get_text()
+                          for t in ftab.find_all('span', class_='t')],
+                press_row=[p.get_text() for p in ftab.find_all(
+                    'span', class_='value pres pres_mmhg')],
+                wind_vel_row=[
+                    w.find('span', class_='value wind wind_ms').get_text()
+                    for w in ftab.find_all('span', class_='windSpeed')])
+
+    def parse_lxml(self, tree):
+        xpath = self.xpath
+        ftab = xpath['ftab'](tree)[0]
+
+        # Parsing start date from source html page
+        self.parse_start_date(text(xpath['date'](ftab)[0]))
+
+        # Parsing next days urls from source first day page
+        next_days_urls = self.next_days_urls([
+            a.get('href') for a in xpath['days_links'](ftab)])
+
+        # Scraping tables data to array
+        ftabs = [ftab] + [xpath['ftab'](lxml_html.fromstring(
+            get_html(ndu)))[0] for ndu in next_days_urls]
+
+        # Parsing from saved tables
+        for ftab in ftabs:
+            ftab = xpath['hour_container'](ftab)[0]
+            self.extend_rows(
+                time_row=[text(t) for t in xpath['time_24h'](ftab)],
+                temp_row=[text(t) for t in xpath['temp_c'](ftab)],
+                press_row=[text(p) for p in xpath['pres_mmhg'](ftab)],
+                wind_vel_row=[text(w) for w in xpath['wind_ms'](ftab)])
 
 # TODO: ADD NEW FORECAST SCRAPER CLASS HERE
 
@@ -262,37 +509,28 @@ class foreca(BaseForecastScraper):
 # MISC #
 ########
 
-def get_soup(url, archive_payload=False):
-    """Scraping html content from source with the help of Selenium library"""
+def download_html(url, archive_payload=False):
+    """Scraping html content from source with the help of pooled fetcher"""
 
-    headers = {'Accept': '*/*', 'User-Agent': UserAgent().random}
+    if not archive_payload:
+        return fetch_text(url)
+    return fetch_text(
+        url, data=archive_payload, headers={'Referer': 'https://rp5.ru/'})
 
-    if PROXY:
-        proxy = f'http://{PROXY[2]}:{PROXY[3]}@{PROXY[0]}:{PROXY[1]}'
-        proxies = {'https': proxy}
-    else:
-        proxies = None
 
-    if not archive_payload:
-        response = requests.get(
-            url=url,
-            headers=headers,
-            proxies=proxies,
-            timeout=10,
-        )
+def get_html(url, archive_payload=False):
+    """Html content from source, or from fixture store in replay mode"""
+    with span('fetch', url=url):
+        return FIXTURES.serve(
+            url, archive_payload,
+            partial(download_html, url, archive_payload))
 
-    else:
-        headers['Referer'] = 'https://rp5.ru/'
-        response = requests.post(
-            url=url,
-            headers=headers,
-            data=archive_payload,
-            proxies=proxies,
-            timeout=10
-        )
 
-    src = response.text
-    return BeautifulSoup(src, "lxml")
+def get_soup(url, archive_payload=False):
+    """Scraped html content parsed by BeautifulSoup"""
+    html = get_html(url, archive_payload)
+    with span('parse', parser='bs4'):
+        return BeautifulSoup(html, "lxml")
 
 
 def month_name_to_number(name):
@@ -324,23 +562,136 @@ def month_name_to_number(name):
 # SELENIUM #
 ############
 
-driver = None
+SELENIUM_LOGGER = init_logger('Selenium')
 
 
-def get_soup_selenium(url):
+class DriverPool():
+    """Pool of long-lived remote Chrome sessions.
+
+    Sessions are health-checked before use, and recycled after
+    `max_pages` pages or on error.
+    """
+
+    def __init__(self, size, max_pages, factory):
+        self.size = size
+        self.max_pages = max_pages
+        self.factory = factory
+        # Idle sessions, the last returned is taken first
+        self.idle = []
+        self.pages = {}
+        self.created = 0
+        # Waiters of full pool are notified on every returned or
+        # discarded session
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Take idle healthy session, start new one if pool is not full."""
+        while True:
+            with self.condition:
+                while not self.idle and self.created >= self.size:
+                    self.condition.wait()
+                driver = self.idle.pop() if self.idle else None
+                if not driver:
+                    self.created += 1
+
+            if not driver:
+                SELENIUM_LOGGER.debug("Driver initialization")
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self.condition:
+                        self.created -= 1
+                        self.condition.notify()
+                    raise
+                with self.condition:
+                    self.pages[driver] = 0
+                return driver
+
+            if self.is_healthy(driver):
+                return driver
+            self.discard(driver)
+
+    def release(self, driver, error=False):
+        """Return session to pool or recycle it."""
+        with self.condition:
+            self.pages[driver] += 1
+            recycle = error or self.pages[driver] >= self.max_pages
+            if not recycle:
+                self.idle.append(driver)
+                self.condition.notify()
+        if recycle:
+            self.discard(driver)
+
+    def discard(self, driver):
+        with self.condition:
+            self.pages.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self.condition:
+            self.created -= 1
+            self.condition.notify()
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            return driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, error=True)
+            raise
+        self.release(driver)
+
+    def close(self):
+        """Quit all idle sessions."""
+        with self.condition:
+            drivers, self.idle = self.idle, []
+        for driver in drivers:
+            self.discard(driver)
+
+
+def download_html_selenium(url, wait_for=None):
     """Scraping html content from source with the help of Selenium library"""
-    global driver
 
-    if not driver:
-        logger = init_logger('Selenium')
-        logger.debug("Driver initialization")
-        driver = init_selenium_driver()
+    with DRIVER_POOL.driver() as driver:
+        with LIMITER.slot(url), FETCHER.track(driver.proxy), \
+                FETCH_SECONDS.time(host=urlsplit(url).hostname):
+            driver.get(url=url)
+        if wait_for:
+            # Waiting for rendering of required element
+            try:
+                WebDriverWait(driver, 10).until(
+                    expected_conditions.presence_of_element_located(
+                        (By.CSS_SELECTOR, wait_for)))
+            except TimeoutException:
+                pass
+        page_source = driver.page_source
+        FETCH_BYTES.inc(
+            len(page_source.encode()), host=urlsplit(url).hostname)
+        return page_source
+
 
-    driver.get(url=url)
-    time.sleep(1)
-    src = driver.page_source
+def get_html_selenium(url, wait_for=None):
+    """Selenium html content, or from fixture store in replay mode"""
+    with span('fetch', url=url, selenium=True):
+        return FIXTURES.serve(
+            url, None, partial(download_html_selenium, url, wait_for),
+            selenium=True)
 
-    return BeautifulSoup(src, "lxml")
+
+def get_soup_selenium(url, wait_for=None):
+    """Selenium scraped html content parsed by BeautifulSoup"""
+    html = get_html_selenium(url, wait_for)
+    with span('parse', parser='bs4'):
+        return BeautifulSoup(html, "lxml")
 
 
 def init_selenium_driver():
@@ -367,9 +718,11 @@ def init_selenium_driver():
     # disable extensions
     # # options.add_argument('--disable-extensions')
 
-    if PROXY:
+    # Browser session uses the healthiest proxy at its start
+    proxy = FETCHER.choose_proxy()
+    if proxy:
         proxies_extension = selenium_proxy(
-            PROXY[2], PROXY[3], PROXY[0], PROXY[1])
+            proxy[2], proxy[3], proxy[0], proxy[1])
         options.add_extension(proxies_extension)
 
     # Waits for page to be interactive
@@ -383,12 +736,15 @@ def init_selenium_driver():
         command_executor=f'http://{SELENIUM_HOST}:4444/wd/hub',
         options=options)
 
+    # Proxy of session for proxy pool stats
+    driver.proxy = proxy
+
     # Change the property value of the navigator for webdriver to undefined
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', \
                           {get: () => undefined})")
 
     # pass in selected user agent as an argument
-    options.add_argument(f'user-agent={UserAgent().random}')
+    options.add_argument(f'user-agent={FETCHER.user_agent()}')
 
     # # enable stealth mode
     # stealth(driver,
@@ -403,6 +759,7 @@ def init_selenium_driver():
     return driver
 
 
+@lru_cache
 def selenium_proxy(username, password, endpoint, port):
     """Enabling using proxy with Selenium."""
     manifest_json = """
@@ -458,10 +815,23 @@ def selenium_proxy(username, password, endpoint, port):
     );
     """ % (endpoint, port, username, password)
 
-    extension = 'proxies_extension.zip'
-
-    with zipfile.ZipFile(extension, 'w') as zp:
-        zp.writestr("manifest.json", manifest_json)
-        zp.writestr("background.js", background_js)
+    # File per proxy, so drivers of different proxies don't share
+    # credentials. It is written to temporary file and renamed, so driver
+    # of another process never reads partially written one.
+    key = hashlib.sha1(f"{username}@{endpoint}:{port}".encode()).hexdigest()
+    extension = os.path.join(
+        tempfile.gettempdir(), f"proxies_extension_{key}.zip")
+    with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(extension), suffix='.zip',
+            delete=False) as file:
+        with zipfile.ZipFile(file, 'w') as zp:
+            zp.writestr("manifest.json", manifest_json)
+            zp.writestr("background.js", background_js)
+    os.replace(file.name, extension)
 
     return extension
+
+
+DRIVER_POOL = DriverPool(
+    SELENIUM_POOL_SIZE, SELENIUM_MAX_PAGES, init_selenium_driver)
+atexit.register(DRIVER_POOL.close)
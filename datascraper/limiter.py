@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlsplit
+from django.conf import settings
+
+DEFAULT_LIMIT = {'rate': 1, 'burst': 3, 'max_in_flight': 4}
+
+
+class TokenBucket():
+    """Token bucket: `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token, return seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class HostLimiter():
+    """Politeness limits for single source host."""
+
+    def __init__(self, host, rate, burst, max_in_flight):
+        self.host = host
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = threading.BoundedSemaphore(max_in_flight)
+        self.async_semaphores = {}
+        self.requests = 0
+        self.wait_time = 0
+        self.lock = threading.Lock()
+
+    def add_wait(self, wait_time):
+        with self.lock:
+            self.requests += 1
+            self.wait_time += wait_time
+
+    def pop_stats(self):
+        """Requests and wait time since last call, counters are reset."""
+        with self.lock:
+            stats = self.requests, self.wait_time
+            self.requests = self.wait_time = 0
+        return stats
+
+    @contextmanager
+    def slot(self):
+        """Block until request to host is allowed."""
+        start = time.monotonic()
+        with self.semaphore:
+            time.sleep(self.bucket.reserve())
+            self.add_wait(time.monotonic() - start)
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Wait in event loop until request to host is allowed."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        # asyncio semaphores are bound to event loop
+        semaphore = self.async_semaphores.get(loop)
+        if not semaphore:
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            self.async_semaphores = {loop: semaphore}
+        async with semaphore:
+            await asyncio.sleep(self.bucket.reserve())
+            self.add_wait(time.monotonic() - start)
+            yield
+
+
+class Limiter():
+    """Per-host politeness limiters configured by SCRAPER_HOST_LIMITS."""
+
+    def __init__(self, limits=None):
+        self.limits = limits
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get_limits(self, host):
+        limits = self.limits
+        if limits is None:
+            limits = getattr(settings, 'SCRAPER_HOST_LIMITS', {})
+        for key, value in limits.items():
+            if host == key or host.endswith('.' + key):
+                return value
+        return limits.get('default', DEFAULT_LIMIT)
+
+    def host_limiter(self, url):
+        host = urlsplit(url).hostname or ''
+        with self.lock:
+            limiter = self.hosts.get(host)
+            if not limiter:
+                limiter = HostLimiter(host, **self.get_limits(host))
+                self.hosts[host] = limiter
+        return limiter
+
+    def slot(self, url):
+        return self.host_limiter(url).slot()
+
+    def async_slot(self, url):
+        return self.host_limiter(url).async_slot()
+
+    def report(self):
+        """Time spent waiting for a slot per host since last report.
+
+        Long running scheduler and worker report every run separately.
+        """
+        with self.lock:
+            hosts = list(self.hosts.values())
+        lines = []
+        for host_limiter in hosts:
+            requests, wait_time = host_limiter.pop_stats()
+            if requests:
+                lines.append(f"{host_limiter.host}: {requests} requests, "
+                             f"waited {wait_time:.1f} s")
+        return '\n'.join(lines)
+
+
+LIMITER = Limiter()
@@ -1,38 +1,160 @@
+import atexit
+import html
 import logging
+import queue
 import sys
+import threading
 import tg_logger
+from logging.handlers import (
+    BufferingHandler, QueueHandler, QueueListener, RotatingFileHandler)
 from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+BASE_DIR = Path(__file__).resolve().parent.parent
+# Log file of scrapers, test runs log to temporary one (see manage.py)
+LOG_FILE = Path(os.environ.get("LOG_FILE", BASE_DIR / "datascraper.log"))
+# Log file is rotated after this size, few old files are kept
+LOG_FILE_MAX_BYTES = int(os.environ.get("LOG_FILE_MAX_BYTES", 5 * 2 ** 20))
+LOG_FILE_BACKUPS = int(os.environ.get("LOG_FILE_BACKUPS", 5))
+# Telegram messages are sent as digest once in this period, seconds
+TELEGRAM_DIGEST_INTERVAL = int(
+    os.environ.get("TELEGRAM_DIGEST_INTERVAL", 60))
+
+FORMATTER = logging.Formatter(
+    "[%(asctime)s] %(levelname)s: %(name)s: %(message)s")
+
+_LOCK = threading.Lock()
+_QUEUE = None
+
+
+class TelegramDigestHandler(BufferingHandler):
+    """Buffer of log records sent to target handler as periodic digest.
+
+    Buffer is flushed every `interval` seconds by own thread, when it is
+    full, or immediately for CRITICAL record. Digest is split in messages
+    of at most `max_length` characters (Telegram limit is 4096).
+    """
+
+    def __init__(self, target, interval=TELEGRAM_DIGEST_INTERVAL,
+                 capacity=100, max_length=4000):
+        super().__init__(capacity)
+        self.target = target
+        self.max_length = max_length
+        self.stopped = threading.Event()
+        if interval:
+            threading.Thread(target=self.run, args=(interval,),
+                             daemon=True).start()
+
+    def run(self, interval):
+        while not self.stopped.wait(interval):
+            self.flush()
+
+    def shouldFlush(self, record):
+        return super().shouldFlush(record) or \
+            record.levelno >= logging.CRITICAL
+
+    def digest(self, records):
+        """Html messages with records lines."""
+        messages, lines = [], []
+        for record in records:
+            line = html.escape(self.format(record))[:self.max_length]
+            if lines and \
+                    len('\n'.join(lines + [line])) > self.max_length:
+                messages.append(lines)
+                lines = []
+            lines.append(line)
+        if lines:
+            messages.append(lines)
+        return ['<code>' + '\n'.join(lines) + '</code>'
+                for lines in messages]
+
+    def flush(self):
+        with self.lock:
+            records, self.buffer = self.buffer, []
+        if not records:
+            return
+        level = max(record.levelno for record in records)
+        for message in self.digest(records):
+            self.target.handle(logging.makeLogRecord({
+                'name': 'Digest', 'levelno': level,
+                'levelname': logging.getLevelName(level), 'msg': message}))
+
+    def close(self):
+        self.stopped.set()
+        super().close()
+
+
+def telegram_handler():
+    """Digest handler for Telegram users from .env file, None if not set."""
+    load_dotenv()
+    token = os.environ.get("TELEGRAM_TOKEN")
+    users = os.environ.get("TELEGRAM_USERS")
+    if not token or not users:
+        return None
+    target = tg_logger.TgLoggerHandler(token=token, users=users.split('\n'))
+    target.setFormatter(logging.Formatter(
+        "<b>%(name)s:%(levelname)s</b>\n%(message)s"))
+    handler = TelegramDigestHandler(target)
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s: %(name)s: %(message)s", "%H:%M:%S"))
+    handler.setLevel(logging.INFO)
+    return handler
+
+
+def setup_logging():
+    """Queue of log records and the listener thread, started once.
+
+    Loggers only put records to queue, so slow handlers (file, Telegram)
+    never delay scraping threads.
+    """
+    global _QUEUE
+    with _LOCK:
+        if _QUEUE is not None:
+            return _QUEUE
+
+        # logging to Terminal
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(FORMATTER)
+
+        # logging to *.log File
+        file_handler = RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_FILE_BACKUPS)
+        file_handler.setFormatter(FORMATTER)
+        file_handler.setLevel(logging.INFO)
+
+        handlers = [stream_handler, file_handler]
+
+        # logging to Telegram
+        digest_handler = telegram_handler()
+        if digest_handler:
+            handlers.append(digest_handler)
+
+        _QUEUE = queue.SimpleQueue()
+        listener = QueueListener(
+            _QUEUE, *handlers, respect_handler_level=True)
+        listener.start()
+
+        def stop():
+            # Records left in queue are handled, last digest is sent
+            listener.stop()
+            for handler in handlers:
+                handler.close()
+
+        atexit.register(stop)
+        return _QUEUE
+
 
 def init_logger(name):
-    """Initialization logger for all applications."""
+    """Initialization logger for all applications.
+
+    Repeated initialization of the same logger doesn't add handlers.
+    """
 
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        "[%(asctime)s] %(levelname)s: %(name)s: %(message)s")
-
-    # logging to Terminal
-    stream_handler = logging.StreamHandler(sys.stdout)
-    logger.addHandler(stream_handler)
-    stream_handler.setFormatter(formatter)
-
-    # logging to *.log File
-    BASE_DIR = Path(__file__).resolve().parent.parent
-    file_handler = logging.FileHandler(BASE_DIR / "datascraper.log")
-    logger.addHandler(file_handler)
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.INFO)
-    # file_handler.setLevel(logging.DEBUG)
-
-    # logging to Telegram
-    load_dotenv()
-    token = os.environ["TELEGRAM_TOKEN"]
-    users = os.environ["TELEGRAM_USERS"].split('\n')
-    telegram_handler = tg_logger.setup(logger, token=token, users=users)
-    # telegram_handler.setLevel(logging.CRITICAL)
-    telegram_handler.setLevel(logging.INFO)
-
+    if not any(isinstance(handler, QueueHandler)
+               for handler in logger.handlers):
+        logger.addHandler(QueueHandler(setup_logging()))
     return logger
@@ -0,0 +1,111 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand, CommandError
+from datascraper import forecasts
+from datascraper.archive import parse_arch_rp5
+from datascraper.models import ForecastTemplate, ArchiveTemplate
+from datascraper.recorder import FIXTURES
+from datascraper.metrics import dump_metrics
+
+BACKENDS = ('bs4', 'lxml')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark scraper parsers over recorded fixture pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixtures-version', default='',
+            help="Fixture store version (latest by default).")
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help="Number of parsing runs for every page.")
+        parser.add_argument(
+            '--backend', choices=BACKENDS, default=None,
+            help="Benchmark single parser backend.")
+
+    @dump_metrics
+    def handle(self, *args, **kwargs):
+
+        FIXTURES.use(kwargs['fixtures_version'])
+        entries = FIXTURES.entries()
+        if not entries:
+            raise CommandError(f"No recorded pages in {FIXTURES.path}")
+        self.stdout.write(f"Fixture store: {FIXTURES.path}")
+
+        recorded = {(e['url'], bool(e['payload'])): e
+                    for e in entries.values()}
+        backends = [kwargs['backend']] if kwargs['backend'] else BACKENDS
+
+        # Timings by source: backend -> [pages, parse, get_forecasts]
+        timings = defaultdict(lambda: [0, 0, 0])
+        for template in ForecastTemplate.objects.select_related(
+                'forecast_source', 'location'):
+            entry = recorded.get((template.url, False))
+            if not entry:
+                continue
+            results = {}
+            for backend in backends:
+                results[backend] = self.benchmark_forecast(
+                    template, entry, backend, kwargs['repeat'],
+                    timings[(template.forecast_source.scraper_class,
+                             backend)])
+            if len(set(map(str, results.values()))) > 1:
+                self.stderr.write(f"Backends mismatch: {template.url}")
+
+        for entry in entries.values():
+            if entry['payload'] and ArchiveTemplate.objects.filter(
+                    url=entry['url']).exists():
+                self.benchmark_archive(
+                    entry, kwargs['repeat'], timings[('arch_rp5', 'bs4')])
+
+        self.stdout.write(
+            f"{'source':<12}{'backend':<9}{'pages':>6}"
+            f"{'parse, ms':>12}{'forecasts, ms':>15}")
+        for (source, backend), (pages, parse, get) in sorted(
+                timings.items()):
+            self.stdout.write(
+                f"{source:<12}{backend:<9}{pages:>6}"
+                f"{parse / pages * 1000:>12.2f}{get / pages * 1000:>15.2f}")
+
+    @staticmethod
+    def recorded_datetime(entry, tz):
+        return datetime.fromisoformat(entry['recorded']).astimezone(
+            ZoneInfo(tz))
+
+    def benchmark_forecast(self, template, entry, backend, repeat, timing):
+        """Parsing and generating forecasts from recorded page."""
+        scraper_class = getattr(
+            forecasts, template.forecast_source.scraper_class)
+        local_datetime = self.recorded_datetime(
+            entry, template.location.timezone)
+        start_forecast_datetime = local_datetime.replace(
+            minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scraper_obj = scraper_class(
+                template.url,
+                backend=backend,
+                local_datetime=local_datetime,
+                start_forecast_datetime=start_forecast_datetime)
+            parsed = time.perf_counter()
+            scraped_forecasts = scraper_obj.get_forecasts()
+            timing[0] += 1
+            timing[1] += parsed - start
+            timing[2] += time.perf_counter() - parsed
+        return scraped_forecasts
+
+    def benchmark_archive(self, entry, repeat, timing):
+        """Parsing archive records from recorded page."""
+        start_datetime = self.recorded_datetime(entry, 'UTC')
+        src = FIXTURES.load(entry['url'], entry['payload'])
+        for _ in range(repeat):
+            start = time.perf_counter()
+            records = list(parse_arch_rp5(
+                BeautifulSoup(src, "lxml"), start_datetime))
+            timing[0] += 1
+            timing[1] += time.perf_counter() - start
+        return records
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from datascraper.models import Archive, elapsed_time_decorator
+from datascraper.models import (
+    Archive, ArchiveWatermark, elapsed_time_decorator)
 from datascraper.logging import init_logger
 
 LOGGER = init_logger('Clear archive')
@@ -12,6 +13,7 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         try:
             Archive.objects.all().delete()
+            ArchiveWatermark.objects.all().delete()
             LOGGER.debug("All archive records has been deleted from database.")
         except Exception:
             return
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from datascraper.models import (
-    Forecast, ForecastTemplate, elapsed_time_decorator)
+    Forecast, ForecastScrape, ForecastTemplate, elapsed_time_decorator)
 from datetime import datetime
 from datascraper.logging import init_logger
 from backports import zoneinfo
@@ -15,11 +15,15 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
 
         Forecast.objects.all().delete()
+        ForecastScrape.objects.all().delete()
 
         for template in ForecastTemplate.objects.all():
 
             template.last_scraped = datetime.fromtimestamp(
                 0, tz=zoneinfo.ZoneInfo('UTC'))
+            template.etag = template.last_modified = ''
+            template.content_hash = ''
+            template.last_checked = None
             template.save()
 
         LOGGER.debug("All forecast records has been deleted from database.")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from datascraper.models import (
+    Forecast, ForecastScrape, ForecastTemplate, elapsed_time_decorator)
+from datascraper.logging import init_logger
+from zoneinfo import ZoneInfo
+
+LOGGER = init_logger('Compact forecasts')
+
+
+class Command(BaseCommand):
+    help = 'Copy forecast records to compact storage, record per scrape.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Delete forecast records copied to compact storage')
+
+    @elapsed_time_decorator(LOGGER)
+    def handle(self, *args, **kwargs):
+
+        scrapes = records = 0
+        for template in ForecastTemplate.objects.all():
+            scraped_datetimes = Forecast.objects.filter(
+                forecast_template=template).order_by(
+                'scraped_datetime').values_list(
+                'scraped_datetime', flat=True).distinct()
+            timezone_info = ZoneInfo(template.location.timezone)
+            for scraped_datetime in scraped_datetimes:
+                # Scrapes are grouped by local hour, as in scraper
+                scraped_datetime = scraped_datetime.astimezone(timezone_info)
+                with transaction.atomic():
+                    forecasts = Forecast.scraped(template, scraped_datetime)
+                    ForecastScrape.bulk_upsert(
+                        template, forecasts.items(), scraped_datetime)
+                    if kwargs['delete']:
+                        Forecast.objects.filter(
+                            forecast_template=template,
+                            scraped_datetime=scraped_datetime).delete()
+                scrapes += 1
+                records += len(forecasts)
+
+        self.stdout.write(
+            f"{records} forecast records compacted to {scrapes} scrapes.")
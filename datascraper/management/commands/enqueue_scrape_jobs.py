@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from datascraper.models import ScrapeJob
+
+
+class Command(BaseCommand):
+    help = 'Put stale forecast templates and archive templates to ' + \
+        'scrape jobs queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-archive', action='store_false', dest='archive',
+            help="Enqueue forecast templates only.")
+
+    def handle(self, *args, **kwargs):
+
+        ScrapeJob.enqueue_due(archive=kwargs['archive'])
@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from datascraper.tracing import chrome_trace
+
+
+class Command(BaseCommand):
+    help = 'Export spans from JSON lines trace file to Chrome trace ' + \
+        'format, for chrome://tracing or Perfetto UI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace_file', help="JSON lines spans file.")
+        parser.add_argument('output', help="Chrome trace JSON file.")
+        parser.add_argument(
+            '--trace', default=None,
+            help="Export single trace (root span id) only.")
+        parser.add_argument(
+            '--min-duration', type=float, default=0,
+            help="Skip spans shorter than this, ms.")
+
+    def handle(self, *args, **kwargs):
+
+        try:
+            with open(kwargs['trace_file']) as file:
+                spans = [json.loads(line) for line in file if line.strip()]
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        if kwargs['trace']:
+            spans = [s for s in spans if s['trace'] == kwargs['trace']]
+        spans = [s for s in spans
+                 if s['duration'] * 1000 >= kwargs['min_duration']]
+
+        with open(kwargs['output'], 'w') as file:
+            json.dump(chrome_trace(spans), file)
+        self.stdout.write(f"{len(spans)} spans exported")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from datascraper.models import ForecastTemplate
+
+
+class Command(BaseCommand):
+    help = 'Learn scrape intervals of forecast templates from history.'
+
+    def handle(self, *args, **kwargs):
+
+        ForecastTemplate.learn_scrape_intervals()
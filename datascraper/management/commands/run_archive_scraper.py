@@ -1,10 +1,27 @@
 from django.core.management.base import BaseCommand
 from datascraper.models import ArchiveTemplate
+from datascraper.metrics import dump_metrics
 
 
 class Command(BaseCommand):
     help = 'Run weather archive scraper.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of scraper threads in async mode.")
+        parser.add_argument(
+            '--async', action='store_true', dest='async_mode',
+            help="Scrape templates concurrently with asyncio engine "
+                 "(archive pages are not prefetched).")
+        parser.add_argument(
+            '--copy', action='store_true', dest='use_copy',
+            help="Load records with PostgreSQL COPY (for large backfills).")
+
+    @dump_metrics
     def handle(self, *args, **kwargs):
 
-        ArchiveTemplate.run_scraper()
+        ArchiveTemplate.run_scraper(
+            workers=kwargs['workers'],
+            async_mode=kwargs['async_mode'],
+            use_copy=kwargs['use_copy'])
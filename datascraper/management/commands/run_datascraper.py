@@ -1,10 +1,12 @@
 from django.core.management.base import BaseCommand
 from datascraper.models import ForecastTemplate, ArchiveTemplate
+from datascraper.metrics import dump_metrics
 
 
 class Command(BaseCommand):
     help = 'Run all weather forecast and archive scrapers.'
 
+    @dump_metrics
     def handle(self, *args, **kwargs):
 
         ForecastTemplate.run_scraper()
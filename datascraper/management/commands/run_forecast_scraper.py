@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from datascraper.models import ForecastTemplate
+from datascraper.metrics import dump_metrics
 
 
 class Command(BaseCommand):
@@ -9,9 +10,19 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             'scraper_class', type=str, nargs='?', default=None)
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of templates scraped concurrently.")
+        parser.add_argument(
+            '--async', action='store_true', dest='async_mode',
+            help="Fetch pages with asyncio engine.")
 
+    @dump_metrics
     def handle(self, *args, **kwargs):
 
         scraper_class = kwargs['scraper_class']
 
-        ForecastTemplate.run_scraper(scraper_class)
+        ForecastTemplate.run_scraper(
+            scraper_class,
+            workers=kwargs['workers'],
+            async_mode=kwargs['async_mode'])
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from datascraper.models import TimeZone
 from datascraper.logging import init_logger
 from datascraper.models import elapsed_time_decorator
+from datascraper.metrics import dump_metrics
 
 LOGGER = init_logger('Timezones scraper')
 
@@ -9,6 +10,7 @@ LOGGER = init_logger('Timezones scraper')
 class Command(BaseCommand):
     help = 'Run timezones scraper from Wikipedia.'
 
+    @dump_metrics
     @elapsed_time_decorator(LOGGER)
     def handle(self, *args, **kwargs):
 
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from datascraper.scheduler import ScrapeScheduler
+from datascraper.metrics import dump_metrics
+
+
+class Command(BaseCommand):
+    help = "Run scrape scheduler: every template is scraped when stale, " + \
+        "with per-source intervals."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Number of templates scraped concurrently.")
+        parser.add_argument(
+            '--jitter', type=float, default=0.2,
+            help="Random share of interval to spread templates in time.")
+        parser.add_argument(
+            '--no-archive', action='store_false', dest='archive',
+            help="Schedule forecast templates only.")
+
+    @dump_metrics
+    def handle(self, *args, **kwargs):
+
+        ScrapeScheduler(
+            workers=kwargs['workers'],
+            jitter=kwargs['jitter'],
+            archive=kwargs['archive']).run()
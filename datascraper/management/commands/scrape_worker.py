@@ -0,0 +1,43 @@
+import os
+import socket
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from datascraper.models import ScrapeJob, JQ_LOGGER
+from datascraper.metrics import dump_metrics
+
+
+class Command(BaseCommand):
+    help = 'Run scrape worker, taking jobs from queue. ' + \
+        'Any number of workers can run on several nodes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=1,
+            help="Number of jobs leased at once.")
+        parser.add_argument(
+            '--lease', type=int, default=10,
+            help="Lease time of job in minutes.")
+        parser.add_argument(
+            '--poll', type=int, default=10,
+            help="Seconds to wait for new jobs when queue is empty.")
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit when queue is empty.")
+
+    @dump_metrics
+    def handle(self, *args, **kwargs):
+
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        JQ_LOGGER.debug(f"Worker {worker} started")
+
+        while True:
+            jobs = ScrapeJob.lease(
+                worker, kwargs['batch'], timedelta(minutes=kwargs['lease']))
+            if not jobs:
+                if kwargs['once']:
+                    return
+                time.sleep(kwargs['poll'])
+                continue
+
+            ScrapeJob.run_batch(jobs)
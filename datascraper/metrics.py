@@ -0,0 +1,269 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from django.db import connection
+from datascraper.logging import init_logger
+
+LOGGER = init_logger('Metrics')
+
+# Prometheus text file written at the end of command run, e.g. for
+# node_exporter textfile collector
+METRICS_FILE = os.environ.get("METRICS_FILE", "")
+
+# Seconds
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class TemplateStats():
+    """Totals of single template scraping, see TemplateRun model."""
+
+    def __init__(self):
+        # Seconds
+        self.fetch = 0
+        self.parse = 0
+        self.write = 0
+        self.bytes = 0
+        self.records = 0
+        self.error = ''
+        self.lock = threading.Lock()
+
+
+# Stats of template scraped in current context, None if not tracked.
+# Archive windows threads and async scraper threads copy context, so
+# their requests are added to the template stats.
+TEMPLATE_STATS = contextvars.ContextVar('template_stats', default=None)
+
+
+def add_stat(name, value):
+    """Add value to stats of template scraped in current context."""
+    stats = TEMPLATE_STATS.get()
+    if stats:
+        with stats.lock:
+            setattr(stats, name, getattr(stats, name) + value)
+
+
+def set_error(error):
+    """Error of template scraped in current context."""
+    stats = TEMPLATE_STATS.get()
+    if stats:
+        stats.error = error if isinstance(error, str) else \
+            type(error).__name__
+
+
+def labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def labels_text(labels):
+    if not labels:
+        return ''
+    values = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for key, value in labels)
+    return f'{{{values}}}'
+
+
+class Counter():
+    """Monotonic counter with labels."""
+
+    type = 'counter'
+
+    def __init__(self, name, help='', stat=None):
+        self.name = name
+        self.help = help
+        # Template stats field, incremented together with counter
+        self.stat = stat
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = labels_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        if self.stat:
+            add_stat(self.stat, amount)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, labels, value)
+                    for labels, value in sorted(self.values.items())]
+
+    def summary(self):
+        return [f"{self.name}{labels_text(labels)}: {value}"
+                for _, labels, value in self.samples()]
+
+
+class Histogram():
+    """Distribution of observed values with labels, in buckets."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help='', buckets=DEFAULT_BUCKETS, stat=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # Template stats field, increased by observed values
+        self.stat = stat
+        # labels -> [counts by bucket, sum, count]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = labels_key(labels)
+        with self.lock:
+            counts, total, count = self.values.get(
+                key, ([0] * len(self.buckets), 0, 0))
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+        if self.stat:
+            add_stat(self.stat, value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe run time of the block, seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bucket, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f'{self.name}_bucket',
+                                    labels + (('le', bucket),), cumulative))
+                samples.append((f'{self.name}_bucket',
+                                labels + (('le', '+Inf'),), count))
+                samples.append((f'{self.name}_sum', labels, total))
+                samples.append((f'{self.name}_count', labels, count))
+        return samples
+
+    def summary(self):
+        with self.lock:
+            return [f"{self.name}{labels_text(labels)}: {count} times, "
+                    f"mean {total / count:.3f}, total {total:.3f}"
+                    for labels, (_, total, count)
+                    in sorted(self.values.items())]
+
+
+class Registry():
+    """Metrics of the process by name."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def metric(self, metric_class, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if not metric:
+                metric = metric_class(name, *args, **kwargs)
+                self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, help='', stat=None):
+        return self.metric(Counter, name, help, stat)
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS, stat=None):
+        return self.metric(Histogram, name, help, buckets, stat)
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                with metric.lock:
+                    metric.values = {}
+
+    def render(self):
+        """Metrics in Prometheus text exposition format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{labels_text(labels)} {value}"
+                         for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        """Short summary of observed metrics."""
+        return '\n'.join(line for metric in list(self.metrics.values())
+                         for line in metric.summary())
+
+    def dump(self, path=None):
+        """Log metrics summary, write Prometheus text file if path set."""
+        path = path or METRICS_FILE
+        report = self.report()
+        if report:
+            LOGGER.debug(f"Process totals:\n{report}")
+        if path:
+            # File is replaced at once, so collector never reads a part
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as file:
+                file.write(self.render())
+            os.replace(tmp_path, path)
+
+
+METRICS = Registry()
+
+FETCH_SECONDS = METRICS.histogram(
+    'scraper_fetch_seconds', 'Page download time by source host.',
+    stat='fetch')
+FETCH_BYTES = METRICS.counter(
+    'scraper_fetch_bytes_total', 'Bytes downloaded by source host.',
+    stat='bytes')
+PARSE_SECONDS = METRICS.histogram(
+    'scraper_parse_seconds', 'Page parsing time by scraper class.',
+    stat='parse')
+WRITE_SECONDS = METRICS.histogram(
+    'scraper_write_seconds', 'Database writing time by model.',
+    stat='write')
+ROWS_WRITTEN = METRICS.counter(
+    'scraper_rows_written_total', 'Records written by model and template.',
+    stat='records')
+REQUEST_SECONDS = METRICS.histogram(
+    'web_request_seconds', 'Request processing time by view.')
+REQUEST_QUERIES = METRICS.histogram(
+    'web_request_db_queries', 'Database queries per request by view.',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+
+
+def dump_metrics(handle):
+    """Dump metrics at the end of management command run."""
+
+    @wraps(handle)
+    def wrapper(*args, **kwargs):
+        try:
+            return handle(*args, **kwargs)
+        finally:
+            METRICS.dump()
+    return wrapper
+
+
+def observe_view(view):
+    """Measure request time and database queries count of view."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with REQUEST_SECONDS.time(view=view.__name__), \
+                connection.execute_wrapper(count_query):
+            response = view(request, *args, **kwargs)
+        REQUEST_QUERIES.observe(len(queries), view=view.__name__)
+        return response
+    return wrapper
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0034_alter_forecasttemplate_last_scraped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecasttemplate',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='forecasttemplate',
+            name='etag',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='forecasttemplate',
+            name='last_modified',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
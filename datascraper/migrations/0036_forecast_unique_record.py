@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:34
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep only last written record of duplicated forecasts."""
+    Forecast = apps.get_model('datascraper', 'Forecast')
+    duplicates = Forecast.objects.values(
+        'forecast_template', 'scraped_datetime', 'forecast_datetime'
+    ).annotate(last_id=Max('id'), records=Count('id')).filter(records__gt=1)
+    for duplicate in list(duplicates):
+        Forecast.objects.filter(
+            forecast_template=duplicate['forecast_template'],
+            scraped_datetime=duplicate['scraped_datetime'],
+            forecast_datetime=duplicate['forecast_datetime']).exclude(
+            id=duplicate['last_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0035_forecasttemplate_conditional_fetch'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='forecast',
+            constraint=models.UniqueConstraint(fields=('forecast_template', 'scraped_datetime', 'forecast_datetime'), name='unique_forecast_record'),
+        ),
+    ]
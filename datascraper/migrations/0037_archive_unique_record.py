@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep only first scraped record of duplicated archive records."""
+    Archive = apps.get_model('datascraper', 'Archive')
+    duplicates = Archive.objects.values(
+        'archive_template', 'record_datetime'
+    ).annotate(first_id=Min('id'), records=Count('id')).filter(records__gt=1)
+    for duplicate in list(duplicates):
+        Archive.objects.filter(
+            archive_template=duplicate['archive_template'],
+            record_datetime=duplicate['record_datetime']).exclude(
+            id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0036_forecast_unique_record'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='archive',
+            name='datascraper_archive_1acdc0_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='archive',
+            constraint=models.UniqueConstraint(fields=('archive_template', 'record_datetime'), name='unique_archive_record'),
+        ),
+    ]
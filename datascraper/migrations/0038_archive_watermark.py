@@ -0,0 +1,41 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:48
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Max
+
+
+def backfill_watermarks(apps, schema_editor):
+    """Watermark of every template from its latest archive record."""
+    Archive = apps.get_model('datascraper', 'Archive')
+    ArchiveWatermark = apps.get_model('datascraper', 'ArchiveWatermark')
+    ArchiveWatermark.objects.bulk_create([
+        ArchiveWatermark(
+            archive_template_id=latest['archive_template'],
+            last_record_datetime=latest['last_record_datetime'])
+        for latest in Archive.objects.values('archive_template').annotate(
+            last_record_datetime=Max('record_datetime'))])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0037_archive_unique_record'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveWatermark',
+            fields=[
+                ('archive_template', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='watermark', serialize=False, to='datascraper.archivetemplate')),
+                ('last_record_datetime', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivesource',
+            name='publication_lag',
+            field=models.DurationField(default=datetime.timedelta(seconds=10800)),
+        ),
+        migrations.RunPython(backfill_watermarks, migrations.RunPython.noop),
+    ]
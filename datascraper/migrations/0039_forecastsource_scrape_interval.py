@@ -0,0 +1,19 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:49
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0038_archive_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastsource',
+            name='scrape_interval',
+            field=models.DurationField(default=datetime.timedelta(seconds=3300)),
+        ),
+    ]
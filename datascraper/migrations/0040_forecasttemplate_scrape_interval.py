@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0039_forecastsource_scrape_interval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecasttemplate',
+            name='scrape_interval',
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0040_forecasttemplate_scrape_interval'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('forecast', 'Forecast'), ('archive', 'Archive')], max_length=10)),
+                ('template_id', models.IntegerField()),
+                ('priority', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('leased_by', models.CharField(blank=True, default='', max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['priority', 'created'], name='datascraper_priorit_688472_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scrapejob',
+            constraint=models.UniqueConstraint(fields=('kind', 'template_id'), name='unique_scrape_job'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0041_scrapejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('forecast', 'Forecast'), ('archive', 'Archive')], max_length=10)),
+                ('started', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('templates', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TemplateRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(default=django.utils.timezone.now)),
+                ('total_ms', models.IntegerField(default=0)),
+                ('fetch_ms', models.IntegerField(default=0)),
+                ('parse_ms', models.IntegerField(default=0)),
+                ('write_ms', models.IntegerField(default=0)),
+                ('bytes_downloaded', models.BigIntegerField(default=0)),
+                ('records_written', models.IntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=100)),
+                ('archive_template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='datascraper.archivetemplate')),
+                ('forecast_template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='datascraper.forecasttemplate')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='template_runs', to='datascraper.scraperun')),
+            ],
+        ),
+    ]
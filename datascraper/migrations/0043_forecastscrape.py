@@ -0,0 +1,30 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0042_scraperun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastScrape',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scraped_datetime', models.DateTimeField()),
+                ('start_datetime', models.DateTimeField()),
+                ('hours', models.PositiveSmallIntegerField()),
+                ('parameters', models.PositiveSmallIntegerField()),
+                ('data', models.BinaryField()),
+                ('forecast_template', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='datascraper.forecasttemplate')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='forecastscrape',
+            constraint=models.UniqueConstraint(fields=('forecast_template', 'scraped_datetime'), name='unique_forecast_scrape'),
+        ),
+    ]
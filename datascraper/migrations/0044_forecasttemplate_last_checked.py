@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0043_forecastscrape'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecasttemplate',
+            name='last_checked',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
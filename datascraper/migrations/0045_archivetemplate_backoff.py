@@ -0,0 +1,23 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0044_forecasttemplate_last_checked'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivetemplate',
+            name='next_attempt',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivetemplate',
+            name='stale_runs',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
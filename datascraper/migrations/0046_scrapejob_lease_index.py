@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datascraper', '0045_archivetemplate_backoff'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='scrapejob',
+            name='datascraper_priorit_688472_idx',
+        ),
+        migrations.AddIndex(
+            model_name='scrapejob',
+            index=models.Index(fields=['-priority', 'created'], name='scrape_job_lease_order'),
+        ),
+    ]
@@ -1,16 +1,33 @@
 from django.db import models
 from datetime import datetime, timedelta
 from django.utils import timezone
-from datascraper import forecasts, archive
 from zoneinfo import ZoneInfo
+from array import array
 import collections
+import csv
+import io
+import json
+import math
+import sys
+import time
+from functools import partial, wraps
 from datascraper.logging import init_logger
-from datascraper.forecasts import get_soup
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
-from django.db.models import Count
+from django.db.models import Count, Max
+from django.db import connection, transaction
 from django.utils.decorators import method_decorator
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from datascraper.limiter import LIMITER
+from datascraper.breaker import BREAKERS, retry
+from datascraper.metrics import (
+    ROWS_WRITTEN, WRITE_SECONDS, TEMPLATE_STATS, TemplateStats, set_error)
+from datascraper.tracing import span, traced, propagate
+# Scraping stack (selenium, aiohttp, parsers) is imported inside scraping
+# methods only, so web workers importing models don't load it
 
 ##############
 # VALIDATORS #
@@ -39,6 +56,7 @@ class TimeZone(models.Model):
 
     @classmethod
     def scrap_zones(cls):
+        from datascraper.forecasts import get_soup
         tzones = get_soup(
             'https://en.wikipedia.org/wiki/List_of_tz_database_time_zones')
         tzones = tzones.tbody.find_all('tr')[2:]
@@ -125,6 +143,42 @@ def elapsed_time_decorator(logger):
     return decorator
 
 
+def log_errors(logger, template_ids, results):
+    """Log exceptions of templates returned by run_in_threads."""
+    for template_id, result in zip(template_ids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Template {template_id}: {result!r}",
+                         exc_info=result)
+
+
+def track_template_run(method):
+    """Recording timings of template scraping as TemplateRun.
+
+    Decorated method takes `scrape_run` keyword argument, without it
+    scraping is only traced, but isn't recorded.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, scrape_run=None, **kwargs):
+        with span('template', model=type(self).__name__, id=self.id):
+            if scrape_run is None:
+                return method(self, *args, **kwargs)
+            stats = TemplateStats()
+            started = timezone.now()
+            start = time.perf_counter()
+            token = TEMPLATE_STATS.set(stats)
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                set_error(e)
+                raise
+            finally:
+                TEMPLATE_STATS.reset(token)
+                TemplateRun.record(scrape_run, self, stats, started,
+                                   time.perf_counter() - start)
+    return wrapper
+
+
 ###################
 # FORECAST MODELS #
 ###################
@@ -132,6 +186,20 @@ def elapsed_time_decorator(logger):
 
 FS_LOGGER = init_logger('Forecast scraper')
 
+# Default number of scraper threads in async mode. Threads only parse
+# pages and wait for the event loop, which does all network I/O.
+ASYNC_WORKERS = 32
+
+# Attempts of scraping template on network errors
+SCRAPE_ATTEMPTS = 2
+
+# Bounds of scrape interval learned from forecasts history. Lead time of
+# forecasts is counted in hours, so single scrape per hour is stored.
+SCRAPE_INTERVAL_MIN = timedelta(hours=1)
+SCRAPE_INTERVAL_MAX = timedelta(hours=3)
+# Forecasts history used for learning of scrape interval
+LEARNING_WINDOW = timedelta(days=2)
+
 
 class ForecastSource(models.Model):
     """Forecast source based on specific website."""
@@ -140,6 +208,8 @@ class ForecastSource(models.Model):
     name = models.CharField(max_length=30)
     url = models.URLField(max_length=200, unique=True)
     chart_color = models.CharField(max_length=10)
+    # Templates are scraped by scheduler with this interval
+    scrape_interval = models.DurationField(default=timedelta(minutes=55))
 
     def __str__(self):
         return self.name
@@ -158,7 +228,16 @@ class ForecastTemplate(models.Model):
     url = models.URLField(max_length=500, unique=True)
     last_scraped = models.DateTimeField(
         default=datetime.fromtimestamp(0, tz=ZoneInfo('UTC')))
+    # Last successful check of source: scraping or finding page unchanged
+    last_checked = models.DateTimeField(null=True, blank=True)
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Validators of source page and hash of its forecast table,
+    # for skipping unchanged pages
+    etag = models.CharField(max_length=200, blank=True, default='')
+    last_modified = models.CharField(max_length=50, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Learned from forecasts history, source interval is used if not set
+    scrape_interval = models.DurationField(null=True, blank=True)
 
     class Meta:
         ordering = ['location', 'forecast_source']
@@ -167,7 +246,20 @@ class ForecastTemplate(models.Model):
     def __str__(self):
         return f"{self.forecast_source} --> {self.location}"
 
+    def interval(self):
+        return self.scrape_interval or self.forecast_source.scrape_interval
+
+    # forecasts of last scrape are confirmed by source since this datetime
+    def checked_datetime(self):
+        return self.last_checked or self.last_scraped
+
+    # forecasts are outdated after one hour,
+    # or after scrape interval of template if it is longer
+    def expiration(self):
+        return max(timedelta(hours=1), self.interval() + timedelta(minutes=10))
+
     # run scraper for single template
+    @track_template_run
     def run_template_scraper(self):
 
         FS_LOGGER.debug(f'S: {self}')
@@ -177,41 +269,139 @@ class ForecastTemplate(models.Model):
         start_forecast_datetime = \
             self.location.start_forecast_datetime()
 
+        from datascraper import forecasts
         scraper_class = getattr(forecasts, self.forecast_source.scraper_class)
 
+        # Templates of failing source are skipped until probe succeeds
+        breaker = BREAKERS.get(self.forecast_source.scraper_class)
+        if not breaker.allow():
+            FS_LOGGER.debug(f'B: {self}')
+            set_error('CircuitOpen')
+            return
+
         try:
-            scraper_obj = scraper_class(
-                self.url,
-                local_datetime=local_datetime,
-                start_forecast_datetime=start_forecast_datetime)
+            # Replayed fixture is scraped offline without conditional request
+            if scraper_class.fragment and not forecasts.FIXTURES.replay \
+                    and self.page_unchanged(scraper_class):
+                if self.bump_freshness(local_datetime):
+                    breaker.success()
+                    FS_LOGGER.debug(f'U: {self}')
+                    return True
+
+            with span('scrape', scraper=scraper_class.__name__):
+                scraper_obj = retry(
+                    scraper_class,
+                    self.url,
+                    local_datetime=local_datetime,
+                    start_forecast_datetime=start_forecast_datetime,
+                    attempts=SCRAPE_ATTEMPTS,
+                    exceptions=forecasts.TRANSIENT_ERRORS)
             scraped_forecasts = scraper_obj.get_forecasts()
-            self.last_scraped = local_datetime
+            self.last_scraped = self.last_checked = local_datetime
             self.save()
 
         except Exception as e:
+            # Parsing errors are template faults, source itself answered
+            if isinstance(e, forecasts.TRANSIENT_ERRORS):
+                breaker.failure()
+            else:
+                breaker.success()
+            set_error(e)
             FS_LOGGER.error(f"{self}: {e}")
             return
 
-        for forecast in scraped_forecasts:
+        breaker.success()
 
-            prediction_range_hours = int(
-                (forecast[0] - local_datetime.replace(
-                    minute=0, second=0, microsecond=0))/timedelta(hours=1))
+        storage = forecast_storage()
+        model = storage._meta.model_name
+        with WRITE_SECONDS.time(model=model), span('write', model=model):
+            inserted, updated = storage.bulk_upsert(
+                self, scraped_forecasts, local_datetime)
+        ROWS_WRITTEN.inc(inserted + updated, model=model, template=self.id)
 
-            Forecast.objects.update_or_create(
-                forecast_template=self,
-                forecast_datetime=forecast[0],
-                forecast_data=forecast[1],
-                prediction_range_hours=prediction_range_hours,
-                defaults={'scraped_datetime': local_datetime})
+        FS_LOGGER.debug(f'F: {self} (+{inserted}, ~{updated})')
+        return True
+
+    # conditional request of source page
+    def page_unchanged(self, scraper_class):
+        """Check source page for changes since last scraping.
+
+        Changed page is kept for the scraper, so it isn't downloaded twice.
+        New validators are set, but saved only with successful scraping.
+        """
+        from datascraper.fetcher import fetch_page
+        with span('fetch', url=self.url, conditional=True):
+            page = fetch_page(self.url, self.validators(), keep=True)
+        if page.status == 304:
+            return True
 
-        FS_LOGGER.debug(f'F: {self}')
+        content_hash = scraper_class.content_hash(page.text)
+        unchanged = bool(content_hash) and content_hash == self.content_hash
+        self.etag = page.etag
+        self.last_modified = page.last_modified
+        self.content_hash = content_hash
+        return unchanged
+
+    def validators(self):
+        """Headers for conditional request of source page."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    # last forecasts remain actual, if source page is unchanged
+    def bump_freshness(self, local_datetime):
+        """Mark forecasts of last scrape as checked at local_datetime.
+
+        Forecasts keep their scraped datetime, so lead times stay right.
+        """
+        if not forecast_storage().objects.filter(
+                forecast_template=self,
+                scraped_datetime=self.last_scraped).exists():
+            return False
+        self.last_checked = local_datetime
+        self.save()
         return True
 
+    # run scraper for single template in worker thread
+    @classmethod
+    def run_template_scraper_isolated(cls, template_id, scrape_run=None):
+        """Run template scraper with own database connection."""
+        try:
+            return cls.objects.select_related(
+                'forecast_source', 'location').get(
+                pk=template_id).run_template_scraper(scrape_run=scrape_run)
+        finally:
+            connection.close()
+
+    # run scrapers for templates with asyncio fetch engine
+    @classmethod
+    async def run_scraper_async(cls, templates, workers, scrape_run=None):
+        from datascraper import forecasts
+        from datascraper.fetcher import AsyncFetcher, run_in_threads
+        async with AsyncFetcher() as engine:
+            # Downloading first pages of all templates at once
+            templates_to_prefetch = [
+                template for template in templates if not getattr(
+                    forecasts, template.forecast_source.scraper_class).selenium
+            ]
+            await engine.prefetch(
+                [template.url for template in templates_to_prefetch],
+                {template.url: template.validators()
+                 for template in templates_to_prefetch})
+            template_ids = [template.id for template in templates]
+            log_errors(FS_LOGGER, template_ids, await run_in_threads(
+                partial(cls.run_template_scraper_isolated,
+                        scrape_run=scrape_run),
+                template_ids, workers))
+
     # run scrapers for templates in class, for all if not specified
     @classmethod
+    @traced('run', kind='forecast')
     @method_decorator(elapsed_time_decorator(FS_LOGGER))
-    def run_scraper(cls, scraper_class=None):
+    def run_scraper(cls, scraper_class=None, workers=None, async_mode=False):
         if scraper_class:
             try:
                 ForecastSource.objects.get(
@@ -226,41 +416,123 @@ class ForecastTemplate(models.Model):
             templates = cls.objects.filter(
                 forecast_source__scraper_class=scraper_class)
 
-        for template in templates:
-            template.run_template_scraper()
-
+        scrape_run = ScrapeRun.objects.create(kind=ScrapeRun.FORECAST)
+        try:
+            if async_mode:
+                asyncio.run(cls.run_scraper_async(
+                    list(templates.select_related('forecast_source')),
+                    workers or ASYNC_WORKERS, scrape_run))
+            elif workers and workers > 1:
+                # Templates are scraped concurrently, every worker thread
+                # uses its own database connection
+                template_ids = templates.values_list('id', flat=True)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(
+                        propagate(partial(cls.run_template_scraper_isolated,
+                                          scrape_run=scrape_run)),
+                        template_ids))
+            else:
+                for template in templates:
+                    template.run_template_scraper(scrape_run=scrape_run)
+        finally:
+            scrape_run.finish()
+
+        FS_LOGGER.debug(f"Waiting for hosts slots:\n{LIMITER.report()}")
+        from datascraper.fetcher import PROXY_POOL
+        if PROXY_POOL:
+            FS_LOGGER.debug(f"Proxies:\n{PROXY_POOL.report()}")
+        if BREAKERS.report():
+            FS_LOGGER.debug(f"Failing sources:\n{BREAKERS.report()}")
+
+        # Waiting for all workers before checking
         cls.check_expiration()
 
-        # Closing Selenium driver
-        if forecasts.driver:
-            forecasts.driver.close()
-            forecasts.driver.quit()
         return True
 
+    # how often forecasts of template really change
+    def learn_scrape_interval(self):
+        """Mean time between changes of scraped forecasts.
+
+        Consecutive scrapes are compared by common forecast datetimes.
+        Changes can't be seen more often than scrapes, so if every scrape
+        brought changes, half of observed interval is probed. Returns
+        None if history is too short or has no changes, and template
+        falls back to interval of its source.
+        """
+        scrapes = forecast_storage().history(
+            self, timezone.now() - LEARNING_WINDOW)
+        if len(scrapes) < 3:
+            return None
+
+        scraped = sorted(scrapes)
+        changes = 0
+        for prev, next_ in zip(scraped, scraped[1:]):
+            prev, next_ = scrapes[prev], scrapes[next_]
+            if any(prev[dt] != next_[dt] for dt in prev.keys() & next_):
+                changes += 1
+        if not changes:
+            return None
+        interval = (scraped[-1] - scraped[0]) / changes
+        if changes == len(scraped) - 1:
+            interval /= 2
+        return min(max(interval, SCRAPE_INTERVAL_MIN), SCRAPE_INTERVAL_MAX)
+
+    # adjust scrape intervals of all templates to their change rhythm
+    @classmethod
+    def learn_scrape_intervals(cls):
+        """Template without history gets median interval of its source."""
+        learned = collections.defaultdict(dict)
+        for template in cls.objects.select_related('forecast_source'):
+            learned[template.forecast_source][template] = \
+                template.learn_scrape_interval()
+
+        for source, templates in learned.items():
+            intervals = sorted(i for i in templates.values() if i)
+            median = intervals[len(intervals) // 2] if intervals else None
+            for template, interval in templates.items():
+                template.scrape_interval = interval or median
+                template.save(update_fields=['scrape_interval'])
+            FS_LOGGER.debug(f"Scrape interval: {source}: {median}")
+
+    # templates with datetime of last scraped forecast, single query
+    @classmethod
+    def with_last_forecast(cls):
+        model = forecast_storage()._meta.model_name
+        return cls.objects.select_related('forecast_source').annotate(
+            last_forecast=Max(f'{model}__scraped_datetime'))
+
+    # forecasts of last scrape are not older than expiration time
+    def is_actual(self):
+        return timezone.now() < self.checked_datetime() + self.expiration()
+
+    # template must be annotated by with_last_forecast()
+    def is_outdated(self):
+        if not self.last_forecast:
+            return True
+        checked = max(self.last_forecast, self.checked_datetime())
+        return timezone.now() >= checked + self.expiration()
+
+    @classmethod
+    def expiration_report(cls):
+        """Sources with outdated templates: source, outdated, total."""
+        outdated, total = collections.Counter(), collections.Counter()
+        for template in cls.with_last_forecast():
+            total[template.forecast_source] += 1
+            if template.is_outdated():
+                outdated[template.forecast_source] += 1
+        return [(source, count, total[source])
+                for source, count in outdated.items()]
+
     # Checking for expired forecasts
     # whose data is more than an hour out of date
     @classmethod
     def check_expiration(cls):
-        exp_report = []
-        for template in cls.objects.all():
-            def exp_report_append(): exp_report.append(
-                        template.forecast_source)
-            try:
-                last_forecast = Forecast.objects.filter(
-                    forecast_template=template).latest('scraped_datetime')
-                if not last_forecast.is_actual():
-                    exp_report_append()
-            except Forecast.DoesNotExist:
-                exp_report_append()
+        exp_report = cls.expiration_report()
 
         if exp_report:
-            exp_report = [
-                ((i[0].name+':').ljust(15),
-                 i[1],
-                 ForecastTemplate.objects.filter(forecast_source=i[0]).count())
-                for i in collections.Counter(exp_report).items()]
             exp_report = '\n'.join(
-                [f"{i[0]} {i[1]}/{i[2]} locs" for i in exp_report])
+                [f"{(source.name+':').ljust(15)} {outdated}/{total} locs"
+                 for source, outdated, total in exp_report])
             exp_report = f"OUTDATED data detected:\n{exp_report}"
 
             FS_LOGGER.critical(exp_report)
@@ -286,25 +558,293 @@ class Forecast(models.Model):
                                  "prediction_range_hours",
                                  "forecast_datetime"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["forecast_template",
+                        "scraped_datetime",
+                        "forecast_datetime"],
+                name="unique_forecast_record"),
+        ]
 
-    # check forecast to be not older one hour
+    @classmethod
+    def bulk_upsert(cls, forecast_template, scraped_forecasts,
+                    scraped_datetime):
+        """Write all forecasts of single scrape in one transaction.
+
+        Earlier scrape of the same hour is replaced.
+        Returns numbers of inserted and updated records.
+        """
+        start_datetime = scraped_datetime.replace(
+            minute=0, second=0, microsecond=0)
+
+        # Single record for every forecast datetime, last one wins
+        records = {}
+        for forecast_datetime, forecast_data in scraped_forecasts:
+            records[forecast_datetime] = cls(
+                forecast_template=forecast_template,
+                scraped_datetime=scraped_datetime,
+                forecast_datetime=forecast_datetime,
+                prediction_range_hours=int(
+                    (forecast_datetime - start_datetime)/timedelta(hours=1)),
+                forecast_data=forecast_data)
+
+        with transaction.atomic():
+            # Scrapes of the same hour have the same lead times, so the
+            # last one replaces others
+            same_hour = cls.objects.filter(
+                forecast_template=forecast_template,
+                scraped_datetime__gte=start_datetime,
+                scraped_datetime__lt=start_datetime + timedelta(hours=1))
+            existing = set(same_hour.values_list(
+                'forecast_datetime', flat=True))
+            same_hour.exclude(scraped_datetime=scraped_datetime).delete()
+            cls.objects.bulk_create(
+                records.values(),
+                update_conflicts=True,
+                unique_fields=[
+                    'forecast_template', 'scraped_datetime',
+                    'forecast_datetime'],
+                update_fields=['prediction_range_hours', 'forecast_data'])
+
+        updated = len(existing.intersection(records))
+        return len(records) - updated, updated
+
+    # Reading methods are shared with ForecastScrape, so views and
+    # templates work with any storage, see forecast_storage()
+
+    @classmethod
+    def scraped(cls, forecast_template, scraped_datetime):
+        """Forecasts of single scrape by forecast datetime."""
+        return dict(cls.objects.filter(
+            forecast_template=forecast_template,
+            scraped_datetime=scraped_datetime).values_list(
+            'forecast_datetime', 'forecast_data'))
+
+    @classmethod
+    def lead_range(cls, forecast_template, prediction_range, start, end):
+        """Forecasts made prediction_range hours ahead by forecast
+        datetime from start to end, the latest scrape wins."""
+        return dict(cls.objects.filter(
+            forecast_template=forecast_template,
+            prediction_range_hours=prediction_range,
+            forecast_datetime__range=(start, end)).order_by(
+            'scraped_datetime').values_list(
+            'forecast_datetime', 'forecast_data'))
+
+    @classmethod
+    def history(cls, forecast_template, since):
+        """Forecasts of scrapes since datetime by scraped datetime and
+        forecast datetime."""
+        scrapes = collections.defaultdict(dict)
+        for scraped_datetime, forecast_datetime, forecast_data in \
+                cls.objects.filter(
+                    forecast_template=forecast_template,
+                    scraped_datetime__gte=since
+                ).values_list('scraped_datetime', 'forecast_datetime',
+                              'forecast_data'):
+            scrapes[scraped_datetime][forecast_datetime] = forecast_data
+        return scrapes
+
+    # check forecast to be not older one hour,
+    # or than scrape interval of template if it is longer
     def is_actual(self):
-        exp_datetime = timezone.make_naive(
-            # self.scraped_datetime) + timedelta(minutes=10)
-            self.scraped_datetime) + timedelta(hours=1)
-        return datetime.now() < exp_datetime
+        template = self.forecast_template
+        checked = self.scraped_datetime
+        # Last scrape remains actual while source page is unchanged
+        if self.scraped_datetime == template.last_scraped:
+            checked = max(checked, template.checked_datetime())
+        return timezone.now() < checked + template.expiration()
 
     def __str__(self):
         return f"{self.forecast_template.forecast_source} " + \
             f"--> {self.forecast_template.location}"
 
 
+class ForecastScrape(models.Model):
+    """All forecasts of single scrape in one record.
+
+    Values of every weather parameter are packed in array by forecast
+    hour from start_datetime, NaN for hours missing in source. Arrays of
+    parameters follow each other in data in order of forecast_data.
+    """
+
+    # Little-endian float32 keeps 7 significant digits, sources give at
+    # most two decimals, so values are restored by rounding
+    TYPECODE = 'f'
+    DECIMALS = 3
+
+    forecast_template = models.ForeignKey(
+        ForecastTemplate, on_delete=models.PROTECT)
+    scraped_datetime = models.DateTimeField()
+    start_datetime = models.DateTimeField()
+    hours = models.PositiveSmallIntegerField()
+    parameters = models.PositiveSmallIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["forecast_template", "scraped_datetime"],
+                name="unique_forecast_scrape"),
+        ]
+
+    @classmethod
+    def pack(cls, forecasts):
+        """Fields of record with forecasts by forecast datetime."""
+        forecasts = {forecast_datetime.astimezone(ZoneInfo('UTC')): data
+                     for forecast_datetime, data in forecasts.items()}
+        start_datetime = min(forecasts)
+        hours = int(
+            (max(forecasts) - start_datetime) / timedelta(hours=1)) + 1
+        parameters = max(len(data) for data in forecasts.values())
+
+        values = array(cls.TYPECODE, [math.nan]) * (parameters * hours)
+        for forecast_datetime, forecast_data in forecasts.items():
+            hour = int((forecast_datetime - start_datetime) /
+                       timedelta(hours=1))
+            for parameter, value in enumerate(forecast_data):
+                if value is not None:
+                    values[parameter * hours + hour] = value
+        if sys.byteorder == 'big':
+            values.byteswap()
+
+        return {'start_datetime': start_datetime, 'hours': hours,
+                'parameters': parameters, 'data': values.tobytes()}
+
+    def values(self):
+        values = array(self.TYPECODE)
+        values.frombytes(bytes(self.data))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def restore(self, value):
+        if math.isnan(value):
+            return None
+        value = round(value, self.DECIMALS)
+        return int(value) if value.is_integer() else value
+
+    def hour_data(self, values, hour):
+        """Parameters of forecast hour, None if missing in source."""
+        forecast_data = [self.restore(values[parameter * self.hours + hour])
+                         for parameter in range(self.parameters)]
+        if all(value is None for value in forecast_data):
+            return None
+        return forecast_data
+
+    def forecasts(self):
+        """Forecasts by forecast datetime."""
+        values = self.values()
+        forecasts = {}
+        for hour in range(self.hours):
+            forecast_data = self.hour_data(values, hour)
+            if forecast_data:
+                forecasts[self.start_datetime +
+                          timedelta(hours=hour)] = forecast_data
+        return forecasts
+
+    def forecast(self, forecast_datetime):
+        """Forecast data for datetime, None if not scraped."""
+        hour = (forecast_datetime - self.start_datetime) / timedelta(hours=1)
+        if not hour.is_integer() or not 0 <= hour < self.hours:
+            return None
+        return self.hour_data(self.values(), int(hour))
+
+    @classmethod
+    def bulk_upsert(cls, forecast_template, scraped_forecasts,
+                    scraped_datetime):
+        """Write all forecasts of single scrape as one record.
+
+        Earlier scrape of the same hour is replaced, as in Forecast.
+        Returns numbers of inserted and updated forecasts.
+        """
+        # Single forecast for every forecast datetime, last one wins
+        forecasts = dict(scraped_forecasts)
+        if not forecasts:
+            return 0, 0
+
+        start_datetime = scraped_datetime.replace(
+            minute=0, second=0, microsecond=0)
+        with transaction.atomic():
+            replaced, _ = cls.objects.filter(
+                forecast_template=forecast_template,
+                scraped_datetime__gte=start_datetime,
+                scraped_datetime__lt=start_datetime + timedelta(hours=1)
+            ).exclude(scraped_datetime=scraped_datetime).delete()
+            _, created = cls.objects.update_or_create(
+                forecast_template=forecast_template,
+                scraped_datetime=scraped_datetime,
+                defaults=cls.pack(forecasts))
+
+        if created and not replaced:
+            return len(forecasts), 0
+        return 0, len(forecasts)
+
+    # Reading methods of Forecast
+
+    @classmethod
+    def scraped(cls, forecast_template, scraped_datetime):
+        """Forecasts of single scrape by forecast datetime."""
+        scrape = cls.objects.filter(
+            forecast_template=forecast_template,
+            scraped_datetime=scraped_datetime).first()
+        return scrape.forecasts() if scrape else {}
+
+    @classmethod
+    def lead_range(cls, forecast_template, prediction_range, start, end):
+        """Forecasts made prediction_range hours ahead by forecast
+        datetime from start to end, the latest scrape wins."""
+        timezone_info = ZoneInfo(forecast_template.location.timezone)
+        lead = timedelta(hours=prediction_range)
+        forecasts = {}
+        # Lead time is counted from the local hour of scraping
+        for scrape in cls.objects.filter(
+                forecast_template=forecast_template,
+                scraped_datetime__gte=start - lead - timedelta(hours=1),
+                scraped_datetime__lte=end - lead + timedelta(hours=1),
+                ).order_by('scraped_datetime'):
+            forecast_datetime = timezone.localtime(
+                scrape.scraped_datetime, timezone_info).replace(
+                minute=0, second=0, microsecond=0) + lead
+            if not start <= forecast_datetime <= end:
+                continue
+            forecast_data = scrape.forecast(forecast_datetime)
+            if forecast_data:
+                forecasts[forecast_datetime] = forecast_data
+        return forecasts
+
+    @classmethod
+    def history(cls, forecast_template, since):
+        """Forecasts of scrapes since datetime by scraped datetime and
+        forecast datetime."""
+        return {scrape.scraped_datetime: scrape.forecasts()
+                for scrape in cls.objects.filter(
+                    forecast_template=forecast_template,
+                    scraped_datetime__gte=since)}
+
+    def __str__(self):
+        return f"{self.forecast_template.forecast_source} " + \
+            f"--> {self.forecast_template.location}"
+
+
+def forecast_storage():
+    """Model storing scraped forecasts, by FORECAST_STORAGE setting."""
+    if getattr(settings, 'FORECAST_STORAGE', 'rows') == 'compact':
+        return ForecastScrape
+    return Forecast
+
+
 ##################
 # ARCHIVE MODELS #
 ##################
 
 AS_LOGGER = init_logger('Archive scraper')
 
+# Delay of next attempt after run without new records, doubled by every
+# such run in a row, e.g. for station which stopped publishing
+ARCHIVE_RETRY_MIN = timedelta(minutes=5)
+ARCHIVE_RETRY_MAX = timedelta(days=1)
+
 
 class ArchiveSource(models.Model):
     """Archive record for single datetime."""
@@ -314,6 +854,8 @@ class ArchiveSource(models.Model):
     url = models.URLField(max_length=200, unique=True)
     chart_color = models.CharField(max_length=10)
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # New records can't be published earlier than this after last one
+    publication_lag = models.DurationField(default=timedelta(hours=3))
 
     def __str__(self):
         return self.name
@@ -327,6 +869,9 @@ class ArchiveTemplate(models.Model):
     location = models.ForeignKey(Location, on_delete=models.PROTECT)
     url = models.URLField(max_length=500, unique=True)
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Runs in a row which didn't move watermark, and backoff after them
+    stale_runs = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, blank=True)
 
     # for database performance adding indices
     class Meta:
@@ -336,8 +881,20 @@ class ArchiveTemplate(models.Model):
     def __str__(self):
         return f"{self.archive_source} --> {self.location}"
 
+    def back_off(self, advanced):
+        """Delay next attempt exponentially while runs bring nothing."""
+        if advanced:
+            self.stale_runs, self.next_attempt = 0, None
+        else:
+            self.stale_runs += 1
+            self.next_attempt = timezone.now() + min(
+                ARCHIVE_RETRY_MIN * 2 ** min(self.stale_runs - 1, 16),
+                ARCHIVE_RETRY_MAX)
+        self.save(update_fields=['stale_runs', 'next_attempt'])
+
     # run scraper for single template
-    def run_template_scraper(self):
+    @track_template_run
+    def run_template_scraper(self, use_copy=False):
 
         AS_LOGGER.debug(f'S: {self}')
 
@@ -345,40 +902,120 @@ class ArchiveTemplate(models.Model):
         start_archive_datetime = self.location.start_archive_datetime()
 
         try:
-            last_record_datetime = Archive.objects.filter(
-                archive_template__id=self.id).latest(
-                'record_datetime').record_datetime.replace(
-                tzinfo=timezone_info)
-        except Archive.DoesNotExist:
+            last_record_datetime = self.watermark.last_record_datetime.\
+                astimezone(timezone_info)
+        except ArchiveWatermark.DoesNotExist:
             last_record_datetime = None
 
-        try:
-            archive_data = archive.arch_rp5(
-                start_archive_datetime, self.url, last_record_datetime)
-        except Exception as _ex:
+        # Nothing new can be published by source yet
+        if last_record_datetime and timezone.now() - last_record_datetime < \
+                self.archive_source.publication_lag:
+            AS_LOGGER.debug(f'U: {self}')
+            return True
 
-            AS_LOGGER.error(f"{self}: {_ex}")
+        breaker = BREAKERS.get(self.archive_source.scraper_class)
+        if not breaker.allow():
+            AS_LOGGER.debug(f'B: {self}')
+            set_error('CircuitOpen')
             return
 
-        for record in archive_data:
+        from datascraper.archive import arch_rp5, NETWORK_ERRORS
 
-            Archive.objects.get_or_create(
-                archive_template=self,
-                record_datetime=record[0],
-                data_json=record[1],
-                defaults={'scraped_datetime': timezone.now()})
+        # Every archive page is written as soon as it is parsed
+        inserted, newest_datetime = 0, None
+        try:
+            for archive_data in arch_rp5(
+                    start_archive_datetime, self.url, last_record_datetime):
+                with WRITE_SECONDS.time(model='archive'), \
+                        span('write', model='archive'):
+                    inserted += Archive.bulk_ingest(
+                        self, archive_data, use_copy)
+                # Pages come newest first
+                if archive_data and not newest_datetime:
+                    newest_datetime = max(
+                        record[0] for record in archive_data)
+            # Watermark is moved only when all pages are written, so
+            # failed backfill is resumed from the old one and the gap
+            # in history is filled
+            if newest_datetime:
+                ArchiveWatermark.advance(self, newest_datetime)
+        except Exception as _ex:
+            if isinstance(_ex, NETWORK_ERRORS):
+                breaker.failure()
+            else:
+                breaker.success()
+            set_error(_ex)
+            AS_LOGGER.error(f"{self}: {_ex}")
+            self.back_off(advanced=False)
+            return
+        finally:
+            # Pages written before failure are counted too
+            ROWS_WRITTEN.inc(inserted, model='archive', template=self.id)
+
+        breaker.success()
+        # Only records newer than watermark are yielded
+        self.back_off(advanced=bool(newest_datetime))
+        AS_LOGGER.debug(f'F: {self} (+{inserted})')
+        return True
 
-        AS_LOGGER.debug(f'F: {self}')
+    # run scraper for single template in worker thread
+    @classmethod
+    def run_template_scraper_isolated(cls, template_id, use_copy=False,
+                                      scrape_run=None):
+        """Run template scraper with own database connection."""
+        try:
+            return cls.objects.select_related(
+                'location', 'archive_source', 'watermark').get(
+                pk=template_id).run_template_scraper(
+                    use_copy, scrape_run=scrape_run)
+        finally:
+            connection.close()
+
+    # run scrapers for templates with asyncio fetch engine
+    @classmethod
+    async def run_scraper_async(cls, templates, workers, use_copy,
+                                scrape_run=None):
+        """Templates are scraped concurrently over shared session.
+
+        Unlike forecasts, nothing is prefetched: archive pages are POST
+        requests for windows known only to the scraper.
+        """
+        from datascraper.fetcher import AsyncFetcher, run_in_threads
+        async with AsyncFetcher():
+            template_ids = [template.id for template in templates]
+            log_errors(AS_LOGGER, template_ids, await run_in_threads(
+                partial(cls.run_template_scraper_isolated, use_copy=use_copy,
+                        scrape_run=scrape_run),
+                template_ids, workers))
 
     # run scrapers for templates in class
     @classmethod
+    @traced('run', kind='archive')
     @method_decorator(elapsed_time_decorator(AS_LOGGER))
-    def run_scraper(cls):
+    def run_scraper(cls, workers=None, async_mode=False, use_copy=False):
 
-        templates = cls.objects.all()
+        templates = cls.objects.select_related(
+            'location', 'archive_source', 'watermark')
 
-        for template in templates:
-            template.run_template_scraper()
+        scrape_run = ScrapeRun.objects.create(kind=ScrapeRun.ARCHIVE)
+        try:
+            if async_mode:
+                asyncio.run(cls.run_scraper_async(
+                    list(templates), workers or ASYNC_WORKERS, use_copy,
+                    scrape_run))
+            else:
+                for template in templates:
+                    template.run_template_scraper(
+                        use_copy, scrape_run=scrape_run)
+        finally:
+            scrape_run.finish()
+
+        AS_LOGGER.debug(f"Waiting for hosts slots:\n{LIMITER.report()}")
+        from datascraper.fetcher import PROXY_POOL
+        if PROXY_POOL:
+            AS_LOGGER.debug(f"Proxies:\n{PROXY_POOL.report()}")
+        if BREAKERS.report():
+            AS_LOGGER.debug(f"Failing sources:\n{BREAKERS.report()}")
         return True
 
 
@@ -393,10 +1030,323 @@ class Archive(models.Model):
 
     class Meta:
         ordering = ['archive_template', 'record_datetime']
-        # for database performance adding indices
-        indexes = [
-            models.Index(fields=["archive_template", "record_datetime"]),
+        # unique constraint also serves as index for database performance
+        constraints = [
+            models.UniqueConstraint(
+                fields=["archive_template", "record_datetime"],
+                name="unique_archive_record"),
         ]
 
     def __str__(self):
         return ""
+
+    @classmethod
+    def bulk_ingest(cls, archive_template, records, use_copy=False,
+                    batch_size=1000):
+        """Write new archive records in one transaction.
+
+        Already existing records are skipped. For very large backfills
+        on PostgreSQL `use_copy` loads records with COPY.
+        Returns number of inserted records.
+        """
+        if not records:
+            return 0
+
+        scraped_datetime = timezone.now()
+        # Single record for every record datetime, first one wins
+        records = {record[0]: cls(
+            archive_template=archive_template,
+            scraped_datetime=scraped_datetime,
+            record_datetime=record[0],
+            data_json=record[1]) for record in reversed(records)}
+
+        with transaction.atomic():
+            if use_copy and connection.vendor == 'postgresql':
+                inserted = cls.copy_ingest(records.values())
+            else:
+                # Only datetimes of the batch are looked up, by index
+                existing = set(cls.objects.filter(
+                    archive_template=archive_template,
+                    record_datetime__range=(min(records), max(records))
+                ).order_by().values_list('record_datetime', flat=True))
+                cls.objects.bulk_create(
+                    records.values(), batch_size=batch_size,
+                    ignore_conflicts=True)
+                inserted = len(records.keys() - existing)
+        return inserted
+
+    @classmethod
+    def copy_ingest(cls, records):
+        """Load records with PostgreSQL COPY through temporary table."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow((
+                record.archive_template_id,
+                record.scraped_datetime.isoformat(),
+                record.record_datetime.isoformat(),
+                json.dumps(record.data_json)))
+        buffer.seek(0)
+
+        table = cls._meta.db_table
+        columns = "archive_template_id, scraped_datetime, " \
+            "record_datetime, data_json"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE archive_copy ("
+                "archive_template_id bigint, "
+                "scraped_datetime timestamptz, "
+                "record_datetime timestamptz, "
+                "data_json jsonb) ON COMMIT DROP")
+            cursor.copy_expert(
+                f"COPY archive_copy ({columns}) FROM STDIN WITH CSV", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM archive_copy "
+                f"ON CONFLICT (archive_template_id, record_datetime) "
+                f"DO NOTHING")
+            return cursor.rowcount
+
+
+class ArchiveWatermark(models.Model):
+    """Datetime of the latest archive record of template.
+
+    Archive scraper resumes from watermark instead of searching
+    the latest record in Archive table.
+    """
+
+    archive_template = models.OneToOneField(
+        ArchiveTemplate, on_delete=models.CASCADE, primary_key=True,
+        related_name='watermark')
+    last_record_datetime = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.archive_template}: {self.last_record_datetime}"
+
+    @classmethod
+    def advance(cls, archive_template, record_datetime):
+        """Move watermark forward, never back."""
+        with transaction.atomic():
+            watermark, created = cls.objects.select_for_update(
+                ).get_or_create(
+                archive_template=archive_template,
+                defaults={'last_record_datetime': record_datetime})
+            if not created and \
+                    watermark.last_record_datetime < record_datetime:
+                watermark.last_record_datetime = record_datetime
+                watermark.save(update_fields=['last_record_datetime'])
+
+
+##############
+# JOBS QUEUE #
+##############
+
+JQ_LOGGER = init_logger('Scrape jobs')
+
+
+class ScrapeJob(models.Model):
+    """Scraping of single template, queued for worker processes.
+
+    Workers on any node lease jobs with SELECT ... FOR UPDATE SKIP LOCKED,
+    so every job is taken by one worker. Job of crashed worker is taken
+    again after lease expiry. Finished job is deleted, failed one is
+    retried with backoff, up to MAX_ATTEMPTS.
+    """
+
+    FORECAST = 'forecast'
+    ARCHIVE = 'archive'
+    KINDS = ((FORECAST, 'Forecast'), (ARCHIVE, 'Archive'))
+    TEMPLATES = {FORECAST: ForecastTemplate, ARCHIVE: ArchiveTemplate}
+
+    MAX_ATTEMPTS = 5
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    template_id = models.IntegerField()
+    priority = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    leased_by = models.CharField(max_length=100, blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Order of lease()
+            models.Index(fields=["-priority", "created"],
+                         name="scrape_job_lease_order"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "template_id"], name="unique_scrape_job"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.template_id}"
+
+    # put templates to queue, already queued ones are skipped
+    @classmethod
+    def enqueue(cls, kind, template_ids, priority=0):
+        template_ids = set(template_ids)
+        jobs = cls.objects.filter(kind=kind, template_id__in=template_ids)
+        with transaction.atomic():
+            count_before = jobs.count()
+            cls.objects.bulk_create(
+                [cls(kind=kind, template_id=template_id, priority=priority)
+                 for template_id in template_ids], ignore_conflicts=True)
+            return jobs.count() - count_before
+
+    # enqueue stale templates
+    @classmethod
+    def enqueue_due(cls, archive=True):
+        """Stale forecast templates first, most stale with top priority."""
+        now = timezone.now()
+        enqueued = 0
+        for template in ForecastTemplate.objects.select_related(
+                'forecast_source'):
+            staleness = now - template.checked_datetime()
+            if staleness >= template.interval():
+                enqueued += cls.enqueue(
+                    cls.FORECAST, [template.id],
+                    priority=min(int(staleness.total_seconds() // 60), 10**6))
+        if archive:
+            enqueued += cls.enqueue(
+                cls.ARCHIVE, ArchiveTemplate.objects.exclude(
+                    next_attempt__gt=now).values_list('id', flat=True))
+        JQ_LOGGER.debug(f"{enqueued} jobs enqueued")
+        return enqueued
+
+    @classmethod
+    def lease(cls, worker, batch=1, lease_time=timedelta(minutes=10)):
+        """Take jobs for worker, not taken by any other one."""
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(cls.objects.select_for_update(skip_locked=True).filter(
+                models.Q(leased_until__isnull=True) |
+                models.Q(leased_until__lt=now)).order_by(
+                '-priority', 'created')[:batch])
+            for job in jobs:
+                job.leased_until = now + lease_time
+                job.leased_by = worker
+                job.attempts += 1
+            cls.objects.bulk_update(
+                jobs, ['leased_until', 'leased_by', 'attempts'])
+        return jobs
+
+    @classmethod
+    def run_batch(cls, jobs):
+        """Run leased jobs, templates of each kind in single ScrapeRun."""
+        scrape_runs = {}
+        try:
+            for job in jobs:
+                if job.kind not in scrape_runs:
+                    scrape_runs[job.kind] = ScrapeRun.objects.create(
+                        kind=job.kind)
+                try:
+                    succeeded = job.run(scrape_runs[job.kind])
+                except Exception as e:
+                    # Failure of one job must not stop the worker
+                    JQ_LOGGER.error(f"{job}: {e}")
+                    succeeded = False
+                if succeeded:
+                    job.complete()
+                else:
+                    job.fail()
+        finally:
+            for scrape_run in scrape_runs.values():
+                scrape_run.finish()
+
+    def run(self, scrape_run=None):
+        """Scrape template of job. Returns True on success."""
+        template_class = self.TEMPLATES[self.kind]
+        try:
+            template = template_class.objects.get(pk=self.template_id)
+        except template_class.DoesNotExist:
+            # Template was deleted after enqueueing
+            return True
+        return bool(template.run_template_scraper(scrape_run=scrape_run))
+
+    def complete(self):
+        self.delete()
+
+    def fail(self):
+        if self.attempts >= self.MAX_ATTEMPTS:
+            JQ_LOGGER.error(f"{self}: failed {self.attempts} times, dropped")
+            self.delete()
+            return
+        # Exponential backoff before next attempt
+        self.leased_until = timezone.now() + timedelta(
+            minutes=2 ** self.attempts)
+        self.leased_by = ''
+        self.save(update_fields=['leased_until', 'leased_by'])
+
+
+###############
+# SCRAPE RUNS #
+###############
+
+class ScrapeRun(models.Model):
+    """Single run of scraper over templates, see TemplateRun."""
+
+    FORECAST = 'forecast'
+    ARCHIVE = 'archive'
+    KINDS = ((FORECAST, 'Forecast'), (ARCHIVE, 'Archive'))
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    started = models.DateTimeField(default=timezone.now)
+    # Not set for run interrupted by crash
+    finished = models.DateTimeField(null=True, blank=True)
+    templates = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} run {self.started:%Y-%m-%d %H:%M}"
+
+    def finish(self):
+        self.templates = self.template_runs.count()
+        self.failed = self.template_runs.exclude(error='').count()
+        self.finished = timezone.now()
+        self.save(update_fields=['templates', 'failed', 'finished'])
+
+    def duration(self):
+        return self.finished - self.started if self.finished else None
+
+
+class TemplateRun(models.Model):
+    """Timings and outcome of single template scraping in ScrapeRun."""
+
+    run = models.ForeignKey(
+        ScrapeRun, on_delete=models.CASCADE, related_name='template_runs')
+    forecast_template = models.ForeignKey(
+        ForecastTemplate, on_delete=models.SET_NULL, null=True, blank=True)
+    archive_template = models.ForeignKey(
+        ArchiveTemplate, on_delete=models.SET_NULL, null=True, blank=True)
+    started = models.DateTimeField(default=timezone.now)
+    total_ms = models.IntegerField(default=0)
+    fetch_ms = models.IntegerField(default=0)
+    parse_ms = models.IntegerField(default=0)
+    write_ms = models.IntegerField(default=0)
+    bytes_downloaded = models.BigIntegerField(default=0)
+    records_written = models.IntegerField(default=0)
+    # Exception class name, empty for successful scraping
+    error = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.forecast_template or self.archive_template}"
+
+    @classmethod
+    def record(cls, scrape_run, template, stats, started, duration):
+        template_field = 'forecast_template' if isinstance(
+            template, ForecastTemplate) else 'archive_template'
+        return cls.objects.create(
+            run=scrape_run,
+            started=started,
+            total_ms=round(duration * 1000),
+            fetch_ms=round(stats.fetch * 1000),
+            parse_ms=round(stats.parse * 1000),
+            write_ms=round(stats.write * 1000),
+            bytes_downloaded=stats.bytes,
+            records_written=stats.records,
+            error=stats.error,
+            **{template_field: template})
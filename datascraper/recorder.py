@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+from django.conf import settings
+
+# "record" - save every scraped page to fixture store,
+# "replay" - serve scraped pages from fixture store, without network
+FIXTURES_MODE = os.environ.get("SCRAPER_FIXTURES", "")
+FIXTURES_DIR = os.environ.get(
+    "SCRAPER_FIXTURES_DIR",
+    Path(settings.BASE_DIR) / 'datascraper' / 'recorded')
+# Fixture store version, by default new one for every recording day
+# and the latest one for replay
+FIXTURES_VERSION = os.environ.get("SCRAPER_FIXTURES_VERSION", "")
+
+
+class FixtureMissing(KeyError):
+    """Page was not recorded in fixture store."""
+
+
+class FixtureStore():
+    """Versioned store of scraped html pages for offline runs.
+
+    Every version is a directory with pages by source host and
+    index.json. Page key is sha1 of url and POST payload, so archive
+    windows of the same url are stored separately.
+    """
+
+    def __init__(self, root=FIXTURES_DIR, version='', mode=''):
+        self.root = Path(root)
+        self.mode = mode
+        self.version = version or self.default_version()
+        self.index = None
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    @property
+    def record(self):
+        return self.mode == 'record'
+
+    @property
+    def replay(self):
+        return self.mode == 'replay'
+
+    def use(self, version='', mode='replay'):
+        """Switch store to version and mode."""
+        with self.lock:
+            self.mode = mode
+            self.version = version or self.default_version()
+            self.index = None
+            self.cache = {}
+
+    def default_version(self):
+        if self.mode == 'replay':
+            versions = self.versions()
+            if versions:
+                return versions[-1]
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def versions(self):
+        if not self.root.is_dir():
+            return []
+        return sorted(path.name for path in self.root.iterdir()
+                      if (path / 'index.json').is_file())
+
+    @property
+    def path(self):
+        return self.root / self.version
+
+    @staticmethod
+    def key(url, payload=None):
+        key = url
+        if payload:
+            key += json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def entries(self):
+        """Index of recorded pages: key -> url, payload, recorded."""
+        with self.lock:
+            if self.index is None:
+                index = self.path / 'index.json'
+                self.index = json.loads(index.read_text()) \
+                    if index.is_file() else {}
+            return self.index
+
+    def page_path(self, key):
+        host = urlsplit(self.entries()[key]['url']).hostname or 'local'
+        return self.path / host / f'{key}.html'
+
+    def save(self, url, payload, text, selenium=False):
+        key = self.key(url, payload)
+        entries = self.entries()
+        with self.lock:
+            entries[key] = {
+                'url': url,
+                'payload': dict(payload) if payload else None,
+                'selenium': selenium,
+                'recorded': datetime.now(timezone.utc).isoformat()}
+        page_path = self.page_path(key)
+        with self.lock:
+            page_path.parent.mkdir(parents=True, exist_ok=True)
+            page_path.write_text(text)
+            (self.path / 'index.json').write_text(
+                json.dumps(entries, indent=2, ensure_ascii=False))
+            self.cache[key] = text
+
+    def load(self, url, payload=None):
+        key = self.key(url, payload)
+        if key in self.cache:
+            return self.cache[key]
+        if key not in self.entries():
+            raise FixtureMissing(
+                f"{url} {payload or ''} is not recorded in {self.path}")
+        text = self.page_path(key).read_text()
+        self.cache[key] = text
+        return text
+
+    def serve(self, url, payload, download, selenium=False):
+        """Page text from store in replay mode, else from download()."""
+        if self.replay:
+            return self.load(url, payload)
+        text = download()
+        if self.record:
+            self.save(url, payload, text, selenium)
+        return text
+
+
+FIXTURES = FixtureStore(
+    FIXTURES_DIR, version=FIXTURES_VERSION, mode=FIXTURES_MODE)
@@ -0,0 +1,188 @@
+import heapq
+import random
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from django.utils import timezone
+from datascraper.models import (
+    ForecastTemplate, ArchiveTemplate, ArchiveWatermark, ScrapeRun)
+from datascraper.logging import init_logger
+from datascraper.tracing import span, propagate
+
+LOGGER = init_logger('Scrape scheduler')
+
+# Failed template is scraped again after this delay
+RETRY_DELAY = timedelta(minutes=5)
+# Templates list is reloaded from database, so new ones are scheduled
+RELOAD_INTERVAL = timedelta(minutes=10)
+# Outdated forecasts report period
+REPORT_INTERVAL = timedelta(hours=1)
+# Scrape intervals of templates are learned again after this period
+LEARN_INTERVAL = timedelta(hours=6)
+
+
+class ScrapeScheduler():
+    """Long-running scheduler of forecast and archive templates.
+
+    Templates are kept in priority queue ordered by due time, so the
+    most stale ones are scraped first. Forecast template is due its
+    learned (or source) scrape interval after last scraping, archive
+    template - `publication_lag` after its watermark, or later while it
+    backs off after runs without new records. Due times are
+    moved by random jitter (share of interval), so templates of the
+    same source spread across the hour instead of one burst.
+    """
+
+    def __init__(self, workers=4, jitter=0.2, archive=True):
+        self.workers = workers
+        self.jitter = jitter
+        self.archive = archive
+        self.queue = []
+        self.reloaded = None
+        self.reported = None
+        self.learned = None
+        self.stopped = threading.Event()
+
+    def jittered(self, datetime_, interval, late=False):
+        """Datetime after interval, moved by random share of interval."""
+        jitter = random.uniform(0, self.jitter)
+        return datetime_ + interval * (1 + jitter if late else 1 - jitter)
+
+    def due(self, template):
+        """Next scraping datetime of template."""
+        if isinstance(template, ForecastTemplate):
+            return self.jittered(
+                template.checked_datetime(), template.interval())
+        try:
+            # Archive can't be scraped before publication lag is over
+            due = self.jittered(
+                template.watermark.last_record_datetime,
+                template.archive_source.publication_lag, late=True)
+        except ArchiveWatermark.DoesNotExist:
+            # Archive was never scraped
+            due = timezone.now()
+        # Runs without new records are retried with growing delay
+        if template.next_attempt:
+            due = max(due, template.next_attempt)
+        return due
+
+    def templates(self, model, ids=None):
+        if model is ForecastTemplate:
+            templates = model.objects.select_related('forecast_source')
+        else:
+            templates = model.objects.select_related(
+                'archive_source', 'watermark')
+        if ids is not None:
+            templates = templates.filter(id__in=ids)
+        return templates
+
+    def push(self, model, template_id, due):
+        heapq.heappush(self.queue, (due, model.__name__, template_id))
+
+    def reload(self):
+        """Rebuild queue from all templates in database."""
+        self.queue = []
+        models = [ForecastTemplate] + ([ArchiveTemplate] if self.archive
+                                       else [])
+        for model in models:
+            for template in self.templates(model):
+                self.push(model, template.id, self.due(template))
+        self.reloaded = timezone.now()
+        LOGGER.debug(f"{len(self.queue)} templates scheduled")
+
+    def pop_due(self, now):
+        """Due jobs by template model."""
+        jobs = {ForecastTemplate: [], ArchiveTemplate: []}
+        while self.queue and self.queue[0][0] <= now:
+            _, model, template_id = heapq.heappop(self.queue)
+            model = ForecastTemplate if model == 'ForecastTemplate' \
+                else ArchiveTemplate
+            jobs[model].append(template_id)
+        return jobs
+
+    def run_template(self, model, scrape_run, template_id):
+        """Scrape template, its errors don't stop other templates."""
+        try:
+            return model.run_template_scraper_isolated(
+                template_id, scrape_run=scrape_run)
+        except Exception as e:
+            LOGGER.error(f"{model.__name__} {template_id}: {e!r}",
+                         exc_info=e)
+
+    def reschedule(self, model, ids, now):
+        """Push scraped templates back to queue."""
+        retry = timezone.now() + RETRY_DELAY
+        try:
+            # Deleted templates are not scheduled again
+            dues = [(template.id, self.due(template))
+                    for template in self.templates(model, ids)]
+        except Exception as e:
+            LOGGER.error(f"Rescheduling {model.__name__}: {e!r}")
+            dues = [(template_id, retry) for template_id in ids]
+        for template_id, due in dues:
+            # Template is still stale after unsuccessful scraping
+            self.push(model, template_id, retry if due <= now else due)
+
+    def run_due(self, executor, now):
+        """Scrape due templates and schedule them again."""
+        jobs = self.pop_due(now)
+        for model, ids in jobs.items():
+            if not ids:
+                continue
+            try:
+                scrape_run = ScrapeRun.objects.create(
+                    kind=ScrapeRun.FORECAST if model is ForecastTemplate
+                    else ScrapeRun.ARCHIVE)
+                try:
+                    with span('run', kind=scrape_run.kind):
+                        list(executor.map(propagate(partial(
+                            self.run_template, model, scrape_run)), ids))
+                finally:
+                    scrape_run.finish()
+            except Exception as e:
+                LOGGER.error(f"Running {model.__name__}: {e!r}")
+            # Popped templates are always scheduled again
+            self.reschedule(model, ids, now)
+        return sum(len(ids) for ids in jobs.values())
+
+    def run_once(self, executor):
+        now = timezone.now()
+        if not self.learned or now - self.learned > LEARN_INTERVAL:
+            ForecastTemplate.learn_scrape_intervals()
+            self.learned = now
+            # Templates are rescheduled with new intervals
+            self.reloaded = None
+        if not self.reloaded or now - self.reloaded > RELOAD_INTERVAL:
+            self.reload()
+        scraped = self.run_due(executor, now)
+        if scraped:
+            LOGGER.debug(f"{scraped} templates scraped")
+        if not self.reported or now - self.reported > REPORT_INTERVAL:
+            ForecastTemplate.check_expiration()
+            self.reported = now
+        return scraped
+
+    def sleep_time(self):
+        """Seconds until the next due template, at most a minute."""
+        if not self.queue:
+            return 60
+        wait = (self.queue[0][0] - timezone.now()).total_seconds()
+        return min(max(wait, 0), 60)
+
+    def stop(self, *args):
+        LOGGER.debug("Stopping scheduler")
+        self.stopped.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not self.stopped.is_set():
+                try:
+                    self.run_once(executor)
+                except Exception as e:
+                    # Database may be back on the next loop
+                    LOGGER.error(f"Scheduler loop: {e!r}", exc_info=e)
+                self.stopped.wait(self.sleep_time())
@@ -0,0 +1,105 @@
+"""Synthetic source pages with the markup parsed by scraper classes."""
+
+MONTHS = ('января', 'февраля', 'марта', 'апреля', 'мая', 'июня', 'июля',
+          'августа', 'сентября', 'октября', 'ноября', 'декабря')
+
+
+def date_text(date_):
+    return f'{date_.day} {MONTHS[date_.month - 1]}'
+
+
+def rp5_page(start_date, hours=(9, 15, 21, 3, 9, 15)):
+    """RP5 forecast table, wind is missing in calm hours."""
+
+    def row(name, div_class, values):
+        cells = ''.join(
+            f'<td><div class="{div_class} dfs">{v}</div></td>'
+            if v is not None else '<td></td>' for v in values)
+        return (f'<tr><td><a class="{name} toplink">x</a></td>'
+                f'{cells}<td></td></tr>')
+
+    return (
+        '<html><body><div id="ftab_content"><table>'
+        '<tr><td><span class="weekDay">Суббота, '
+        f'{date_text(start_date)}</span></td></tr>'
+        '<tr class="forecastTime"><td>Время</td>'
+        f"{''.join(f'<td>{h}</td>' for h in hours)}<td></td></tr>"
+        f"{row('t_temperature', 't_0', [-i for i in range(len(hours))])}"
+        f"{row('t_pressure', 'p_0', [745 + i for i in range(len(hours))])}"
+        f"""{row('t_wind_velocity', 'wv_0', [
+            i if i % 2 else None for i in range(len(hours))])}"""
+        '</table></div></body></html>')
+
+
+def meteoinfo_page(start_date, days=3):
+    """Meteoinfo mobile forecast table starting from day."""
+    cells = []
+    for i in range(days * 2):
+        cells.append(
+            f'<td><span class="fc_temp_short">{i - 3}°</span>'
+            f'<span>{i}<i class="wind"></i></span><span>{740 + i}</span>'
+            '</td>')
+    return (
+        '<html><body><div class="hidden-desktop"><table><tr>'
+        f'<td><b><nobr>Сб {date_text(start_date)}</nobr></b>'
+        '<span> День </span></td>'
+        f"{''.join(cells)}</tr></table></div></body></html>")
+
+
+def foreca_page(date_, days_urls, hours=(2, 8, 14, 20)):
+    """Foreca day page with links to next days pages."""
+    links = ''.join(f'<li><a href="{url}">{i}</a></li>'
+                    for i, url in enumerate(days_urls))
+    hours_ = ''.join(
+        '<div class="hour">'
+        f'<span class="time time_24h">{h}</span>'
+        f'<span class="t"><span class="temp_c">{h - 10}</span>'
+        f'<span class="temp_f">{h + 30}</span></span>'
+        f'<span class="value pres pres_mmhg">{740 + h}.5</span>'
+        '<span class="windSpeed">'
+        f'<span class="value wind wind_ms">{h // 2} м/с</span>'
+        '<span class="value wind wind_kmh">0 км/ч</span></span>'
+        '</div>' for h in hours)
+    return (
+        '<html><body><div class="page-content">'
+        f'<div class="date">{date_text(date_)} 2024</div>'
+        f'<ul class="days">{links}</ul>'
+        f'<div class="hourContainer">{hours_}</div>'
+        '</div></body></html>')
+
+
+def yandex_page(start_date, days=2):
+    """Yandex details page: 4 day parts of 6 cells for every day."""
+    articles = []
+    for day in range(days):
+        parts = []
+        for part in range(4):
+            temp = f'+{part}...+{part + 2}°' if part % 2 \
+                else f'{chr(8722)}{part + day}°'
+            parts += [
+                f'<div><div class="icon"></div>{temp}</div>',
+                '<div>Облачно</div>',
+                f'<div>{745 + part}</div>',
+                '<div>80%</div>',
+                f'<div>{part},5<span>м/с</span></div>',
+                '<div>ЮЗ</div>']
+        articles.append(
+            '<article><p><span>'
+            f'{start_date.day + day}</span><span> </span>'
+            f'<span>{MONTHS[start_date.month - 1]}</span></p>'
+            f"{''.join(parts)}</article>")
+    return (
+        '<html><body><main><div>header</div>'
+        f"<div>{''.join(articles)}</div></main></body></html>")
+
+
+def wikipedia_timezones_page(names):
+    """Wikipedia list of tz database time zones."""
+    rows = ''.join(
+        f'<tr><td>RU</td><td>{name}</td><td>+03:00</td></tr>'
+        for name in names)
+    return (
+        '<html><body><table><tbody>'
+        '<tr><th>Country code</th><th>TZ identifier</th></tr>'
+        '<tr><th></th><th></th></tr>'
+        f'{rows}</tbody></table></body></html>')
@@ -0,0 +1,98 @@
+from django.test import SimpleTestCase
+from datascraper.archive import arch_rp5, archive_windows
+from bs4 import BeautifulSoup
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from unittest.mock import patch
+import threading
+import time
+
+MONTHS = ('января', 'февраля', 'марта', 'апреля', 'мая', 'июня', 'июля',
+          'августа', 'сентября', 'октября', 'ноября', 'декабря')
+
+
+def archive_page(last_datetime, days):
+    """RP5 archive page with 3-hourly records, newest first."""
+    rows = []
+    for day in range(days):
+        date_ = last_datetime - timedelta(days=day)
+        for i, hour in enumerate(range(21, -1, -3)):
+            cells = ['<td></td>'] * 29
+            cells[0] = f'<td>{hour:02}</td>'
+            cells[1] = f'<td><div class="t_0 dfs">{day}.{hour}</div></td>'
+            cells[2] = '<td><div class="p_0 dfs">750.1</div></td>'
+            cells[7] = '<td><div class="wv_0">{3 м/с}</div></td>'
+            if i == 0:
+                cells.insert(0, '<td class="cl_dt">{} г. {} {}, день</td>'.
+                             format(date_.year, date_.day,
+                                    MONTHS[date_.month - 1]))
+            rows.append(f"<tr>{''.join(cells)}</tr>")
+    return BeautifulSoup(
+        '<table id="archiveTable"><tr><th>header</th></tr>'
+        f"{''.join(rows)}</table>", "lxml")
+
+
+class ArchRp5TestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.start_datetime = datetime(
+            2024, 1, 13, 21, tzinfo=ZoneInfo('Europe/Moscow'))
+
+    def test_pages_yielded_with_unique_records(self):
+        page = archive_page(self.start_datetime, days=2)
+        end_datetime = self.start_datetime - timedelta(days=40)
+        with patch('datascraper.archive.get_soup',
+                   return_value=page) as get_soup:
+            pages = arch_rp5(self.start_datetime, 'https://rp5.ru/archive',
+                             end_datetime, workers=1)
+            first_page = next(pages)
+            self.assertEqual(get_soup.call_count, 1)
+            self.assertEqual(len(first_page), 16)
+            self.assertEqual(first_page[0], [
+                self.start_datetime, [0.21, 750.1, 3]])
+            self.assertEqual(first_page[-1][0], self.start_datetime.replace(
+                day=12, hour=0))
+            # Same records on next page are not repeated
+            self.assertEqual(list(pages), [[]])
+
+    def test_records_after_end_datetime(self):
+        page = archive_page(self.start_datetime, days=2)
+        end_datetime = self.start_datetime - timedelta(hours=6)
+        with patch('datascraper.archive.get_soup', return_value=page):
+            pages = list(arch_rp5(
+                self.start_datetime, 'https://rp5.ru/archive', end_datetime))
+        self.assertEqual(len(pages), 1)
+        self.assertEqual([r[0].hour for r in pages[0]], [21, 18])
+
+    def test_archive_windows(self):
+        end_datetime = self.start_datetime - timedelta(days=65)
+        self.assertEqual(
+            archive_windows(self.start_datetime, end_datetime),
+            ['13.01.2024', '14.12.2023', '14.11.2023'])
+
+    def test_windows_fetched_concurrently_in_order(self):
+        end_datetime = self.start_datetime - timedelta(days=300)
+        windows = archive_windows(self.start_datetime, end_datetime)
+        in_flight, max_in_flight = [], []
+        lock = threading.Lock()
+
+        def get_soup(url, payload):
+            with lock:
+                in_flight.append(payload['ArchDate'])
+                max_in_flight.append(len(in_flight))
+            # Earlier windows are answered later
+            time.sleep(0.05 / (windows.index(payload['ArchDate']) + 1))
+            with lock:
+                in_flight.remove(payload['ArchDate'])
+            last_datetime = datetime.strptime(
+                payload['ArchDate'], "%d.%m.%Y").replace(
+                    hour=21, tzinfo=self.start_datetime.tzinfo)
+            return archive_page(last_datetime, days=1)
+
+        with patch('datascraper.archive.get_soup', side_effect=get_soup):
+            pages = list(arch_rp5(
+                self.start_datetime, 'https://rp5.ru/archive', end_datetime,
+                workers=3))
+        self.assertEqual(
+            [page[0][0].strftime("%d.%m.%Y") for page in pages], windows)
+        self.assertEqual(max(max_in_flight), 3)
@@ -0,0 +1,76 @@
+from django.test import SimpleTestCase
+from datascraper.breaker import CircuitBreaker, retry, CLOSED, OPEN
+from unittest.mock import Mock, patch
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            'rp5', failure_threshold=2, reset_timeout=60,
+            max_reset_timeout=100)
+
+    def test_open_after_consecutive_failures(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.skipped, 1)
+
+    @patch('datascraper.breaker.time.monotonic')
+    def test_failures_while_open_ignored(self, monotonic):
+        monotonic.return_value = 0
+        self.breaker.failure()
+        self.breaker.failure()
+        # Late failure of request made before opening
+        monotonic.return_value = 50
+        self.breaker.failure()
+        self.assertEqual((self.breaker.opened_at, self.breaker.failures,
+                          self.breaker.reset_timeout), (0, 2, 60))
+        monotonic.return_value = 60
+        self.assertTrue(self.breaker.allow())
+
+    @patch('datascraper.breaker.time.monotonic')
+    def test_half_open_probe(self, monotonic):
+        monotonic.return_value = 0
+        self.breaker.failure()
+        self.breaker.failure()
+        monotonic.return_value = 60
+        # The only probe is allowed
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        # Failed probe doubles timeout
+        self.breaker.failure()
+        self.assertEqual(self.breaker.reset_timeout, 100)
+        monotonic.return_value = 130
+        self.assertFalse(self.breaker.allow())
+        monotonic.return_value = 160
+        self.assertTrue(self.breaker.allow())
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.reset_timeout, 60)
+
+
+class RetryTestCase(SimpleTestCase):
+
+    @patch('datascraper.breaker.time.sleep')
+    def test_retry_with_backoff(self, sleep):
+        func = Mock(side_effect=[TimeoutError, TimeoutError, 'page'])
+        self.assertEqual(retry(func, 'url', attempts=3, delay=1,
+                               exceptions=(TimeoutError,)), 'page')
+        func.assert_called_with('url')
+        waits = [call.args[0] for call in sleep.call_args_list]
+        self.assertTrue(0.5 <= waits[0] <= 1 and 1 <= waits[1] <= 2)
+
+    @patch('datascraper.breaker.time.sleep')
+    def test_not_retried_errors(self, sleep):
+        func = Mock(side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            retry(func, exceptions=(TimeoutError,))
+        self.assertEqual(func.call_count, 1)
+        with self.assertRaises(TimeoutError):
+            retry(Mock(side_effect=TimeoutError), attempts=2,
+                  exceptions=(TimeoutError,))
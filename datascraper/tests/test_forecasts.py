@@ -0,0 +1,178 @@
+from django.test import SimpleTestCase
+from datascraper.forecasts import (
+    DriverPool, selenium_proxy, rp5, yandex, meteoinfo, foreca)
+from datascraper.tests.pages import (
+    rp5_page, meteoinfo_page, foreca_page, yandex_page)
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from unittest.mock import patch
+import tempfile
+import threading
+import time
+import zipfile
+
+
+class FakeDriver():
+
+    def __init__(self):
+        self.alive = True
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise ConnectionError('Session is dead')
+        return 1
+
+    def quit(self):
+        self.alive = False
+
+
+class DriverPoolTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = DriverPool(size=2, max_pages=3, factory=FakeDriver)
+
+    def test_sessions_reused(self):
+        with self.pool.driver() as driver:
+            pass
+        with self.pool.driver() as same_driver:
+            self.assertIs(same_driver, driver)
+        self.assertEqual(self.pool.created, 1)
+
+    def test_pool_size(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertEqual(self.pool.created, 2)
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+
+    def test_recycled_after_max_pages(self):
+        for _ in range(3):
+            with self.pool.driver() as driver:
+                pass
+        self.assertFalse(driver.alive)
+        with self.pool.driver() as new_driver:
+            self.assertIsNot(new_driver, driver)
+
+    def test_recycled_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.pool.driver() as driver:
+                raise ValueError
+        self.assertFalse(driver.alive)
+        self.assertEqual(self.pool.created, 0)
+
+    def test_waiter_woken_by_discarded_session(self):
+        pool = DriverPool(size=1, max_pages=3, factory=FakeDriver)
+        driver = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire()))
+        waiter.start()
+        # Waiter blocks on full pool
+        time.sleep(0.1)
+        pool.release(driver, error=True)
+        waiter.join(timeout=5)
+        self.assertFalse(waiter.is_alive())
+        self.assertIsNot(acquired[0], driver)
+        self.assertEqual(pool.created, 1)
+
+    def test_unhealthy_session_replaced(self):
+        with self.pool.driver() as driver:
+            pass
+        driver.alive = False
+        with self.pool.driver() as new_driver:
+            self.assertIsNot(new_driver, driver)
+        self.pool.close()
+        self.assertFalse(new_driver.alive)
+        self.assertEqual(self.pool.created, 0)
+
+
+class SeleniumProxyTestCase(SimpleTestCase):
+
+    def setUp(self):
+        selenium_proxy.cache_clear()
+        self.addCleanup(selenium_proxy.cache_clear)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        gettempdir = patch('datascraper.forecasts.tempfile.gettempdir',
+                           return_value=tmp.name)
+        gettempdir.start()
+        self.addCleanup(gettempdir.stop)
+
+    def test_extension_per_proxy(self):
+        first = selenium_proxy('user1', 'pass1', '1.1.1.1', '8000')
+        second = selenium_proxy('user2', 'pass2', '2.2.2.2', '8000')
+        self.assertNotEqual(first, second)
+        with zipfile.ZipFile(first) as zp:
+            self.assertIn('"pass1"', zp.read('background.js').decode())
+        with zipfile.ZipFile(second) as zp:
+            self.assertIn('"pass2"', zp.read('background.js').decode())
+
+
+class ParserBackendsTestCase(SimpleTestCase):
+    """BeautifulSoup and lxml backends give identical forecasts."""
+
+    def setUp(self):
+        tz = ZoneInfo('Europe/Moscow')
+        self.local_datetime = datetime(2024, 1, 13, 10, tzinfo=tz)
+        self.kwargs = {
+            'local_datetime': self.local_datetime,
+            'start_forecast_datetime': self.local_datetime.replace(hour=0)}
+
+    def scrape(self, scraper_class, pages, patch_target='get_html'):
+        """Forecasts scraped from pages by url with both backends."""
+        results = []
+        for backend in ('bs4', 'lxml'):
+            with patch(f'datascraper.forecasts.{patch_target}',
+                       side_effect=lambda url, *args, **kwargs: pages[url]):
+                scraper = scraper_class(
+                    'https://source.ru/start', backend=backend, **self.kwargs)
+            results.append((
+                scraper.time_row, scraper.temp_row, scraper.press_row,
+                scraper.wind_vel_row, scraper.get_forecasts()))
+        self.assertEqual(results[0], results[1])
+        return results[1]
+
+    def test_rp5(self):
+        time_row, temp_row, press_row, wind_vel_row, forecasts = self.scrape(
+            rp5, {'https://source.ru/start': rp5_page(self.local_datetime)})
+        self.assertEqual(time_row, [9, 15, 21, 3, 9, 15])
+        self.assertEqual(temp_row, [0, -1, -2, -3, -4, -5])
+        self.assertEqual(wind_vel_row, [0, 1, 0, 3, 0, 5])
+        self.assertEqual(forecasts[3], (
+            self.local_datetime.replace(day=14, hour=3), (-3, 748, 3)))
+
+    def test_meteoinfo(self):
+        time_row, temp_row, press_row, wind_vel_row, forecasts = self.scrape(
+            meteoinfo,
+            {'https://source.ru/start': meteoinfo_page(self.local_datetime)})
+        self.assertEqual(time_row, [15, 3] * 3)
+        self.assertEqual(temp_row, [-3, -2, -1, 0, 1, 2])
+        self.assertEqual(press_row, [740, 741, 742, 743, 744, 745])
+        self.assertEqual(wind_vel_row, [0, 1, 2, 3, 4, 5])
+        self.assertEqual(len(forecasts), 6)
+
+    def test_foreca(self):
+        urls = ['/start', '/day2', '/day3']
+        pages = {
+            f'https://source.ru{url}': foreca_page(
+                self.local_datetime + timedelta(days=i), urls)
+            for i, url in enumerate(urls)}
+        time_row, temp_row, press_row, wind_vel_row, forecasts = self.scrape(
+            foreca, pages)
+        self.assertEqual(time_row, [2, 8, 14, 20] * 3)
+        self.assertEqual(temp_row[:4], [-8, -2, 4, 10])
+        self.assertEqual(press_row[:2], [742.5, 748.5])
+        self.assertEqual(wind_vel_row[:4], [1, 4, 7, 10])
+        self.assertEqual(forecasts[-1][0], self.local_datetime.replace(
+            day=15, hour=20))
+
+    def test_yandex(self):
+        time_row, temp_row, press_row, wind_vel_row, forecasts = self.scrape(
+            yandex,
+            {'https://source.ru/start': yandex_page(self.local_datetime)},
+            patch_target='get_html_selenium')
+        self.assertEqual(time_row, [9, 15, 21, 3] * 2)
+        self.assertEqual(temp_row[:4], [0, 2, -2, 4])
+        self.assertEqual(press_row[:4], [745, 746, 747, 748])
+        self.assertEqual(wind_vel_row[:2], [0.5, 1.5])
+        self.assertEqual(len(forecasts), 8)
@@ -0,0 +1,59 @@
+from django.test import SimpleTestCase
+from datascraper.limiter import TokenBucket, Limiter
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+class TokenBucketTestCase(SimpleTestCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+
+class LimiterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.limiter = Limiter({
+            'default': {'rate': 1000, 'burst': 100, 'max_in_flight': 5},
+            'rp5.ru': {'rate': 1000, 'burst': 100, 'max_in_flight': 2},
+        })
+
+    def test_limits_by_host(self):
+        self.assertEqual(self.limiter.host_limiter(
+            'https://rp5.ru/Weather').max_in_flight, 2)
+        self.assertEqual(self.limiter.host_limiter(
+            'https://www.rp5.ru/Weather').max_in_flight, 2)
+        self.assertEqual(self.limiter.host_limiter(
+            'https://www.foreca.ru/').max_in_flight, 5)
+
+    def test_max_in_flight(self):
+        in_flight, max_seen = [], []
+        lock = threading.Lock()
+
+        def request(_):
+            with self.limiter.slot('https://rp5.ru/'):
+                with lock:
+                    in_flight.append(1)
+                    max_seen.append(len(in_flight))
+                time.sleep(0.01)
+                with lock:
+                    in_flight.pop()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(request, range(16)))
+
+        self.assertEqual(max(max_seen), 2)
+        host_limiter = self.limiter.host_limiter('https://rp5.ru/')
+        self.assertEqual(host_limiter.requests, 16)
+        self.assertGreater(host_limiter.wait_time, 0)
+        self.assertIn('rp5.ru: 16 requests', self.limiter.report())
+        # Next report shows only new requests
+        self.assertEqual(self.limiter.report(), '')
+        with self.limiter.slot('https://rp5.ru/'):
+            pass
+        self.assertIn('rp5.ru: 1 requests', self.limiter.report())
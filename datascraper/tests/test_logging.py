@@ -0,0 +1,71 @@
+from django.test import SimpleTestCase
+from datascraper.logging import init_logger, TelegramDigestHandler
+from logging.handlers import QueueHandler
+from unittest.mock import patch
+import logging
+import queue
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def record(level, msg):
+    return logging.makeLogRecord(
+        {'name': 'Test', 'levelno': level,
+         'levelname': logging.getLevelName(level), 'msg': msg})
+
+
+class InitLoggerTestCase(SimpleTestCase):
+
+    # Records are not handled by listener of real log handlers
+    @patch('datascraper.logging.setup_logging', return_value=queue.Queue())
+    def test_repeated_init_adds_no_handlers(self, setup_logging):
+        logger = init_logger('Test logger')
+        init_logger('Test logger')
+        self.assertEqual(len(logger.handlers), 1)
+        self.assertIsInstance(logger.handlers[0], QueueHandler)
+
+
+class TelegramDigestHandlerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.target = ListHandler()
+        self.handler = TelegramDigestHandler(self.target, interval=0)
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def test_records_sent_as_one_digest(self):
+        for i in range(3):
+            self.handler.handle(record(logging.INFO, f'line {i} <b>'))
+        self.assertEqual(self.target.records, [])
+        self.handler.flush()
+        self.assertEqual(len(self.target.records), 1)
+        self.assertEqual(
+            self.target.records[0].getMessage(),
+            '<code>line 0 &lt;b&gt;\nline 1 &lt;b&gt;\n'
+            'line 2 &lt;b&gt;</code>')
+        # Nothing to send after flush
+        self.handler.flush()
+        self.assertEqual(len(self.target.records), 1)
+
+    def test_critical_record_flushed_immediately(self):
+        self.handler.handle(record(logging.INFO, 'info'))
+        self.handler.handle(record(logging.CRITICAL, 'alert'))
+        self.assertEqual(len(self.target.records), 1)
+        self.assertEqual(self.target.records[0].levelname, 'CRITICAL')
+
+    def test_long_digest_split(self):
+        self.handler.max_length = 25
+        for i in range(4):
+            self.handler.handle(record(logging.INFO, f'message {i}'))
+        self.handler.flush()
+        self.assertEqual(
+            [r.getMessage() for r in self.target.records],
+            ['<code>message 0\nmessage 1</code>',
+             '<code>message 2\nmessage 3</code>'])
@@ -0,0 +1,113 @@
+from django.test import TestCase
+from django.core.management import call_command
+from datascraper.models import (
+    Forecast, ForecastScrape, ForecastTemplate, ScrapeJob, ScrapeRun)
+from datascraper.recorder import FixtureStore
+from datascraper.tests.pages import rp5_page
+from unittest.mock import patch
+from io import StringIO
+from datetime import timedelta
+import tempfile
+import json
+
+
+class BenchmarkParsersTestCase(TestCase):
+    fixtures = ["test_db"]
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.store = FixtureStore(self.root.name, mode='record')
+        fixtures = patch('datascraper.management.commands.'
+                         'benchmark_parsers.FIXTURES', self.store)
+        fixtures.start()
+        self.addCleanup(fixtures.stop)
+
+    def test_benchmark_recorded_pages(self):
+        template = ForecastTemplate.objects.filter(
+            forecast_source__scraper_class='rp5')[0]
+        self.store.save(template.url, None, rp5_page(
+            template.location.local_datetime()))
+        out = StringIO()
+        with patch('datascraper.forecasts.FIXTURES', self.store):
+            call_command('benchmark_parsers', repeat=2, stdout=out)
+        rows = out.getvalue().splitlines()[2:]
+        self.assertEqual([row.split()[:3] for row in rows], [
+            ['rp5', 'bs4', '2'], ['rp5', 'lxml', '2']])
+
+
+class ExportTraceTestCase(TestCase):
+
+    def test_spans_exported_to_chrome_trace(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spans = [
+                {'trace': 'a', 'span': 'a', 'parent': None, 'name': 'run',
+                 'start': 1.5, 'duration': 0.25, 'pid': 1, 'tid': 2,
+                 'thread': 'MainThread', 'attrs': {'kind': 'forecast'}},
+                {'trace': 'b', 'span': 'b', 'parent': None, 'name': 'run',
+                 'start': 2, 'duration': 0.5, 'pid': 1, 'tid': 2,
+                 'thread': 'MainThread', 'attrs': {}}]
+            with open(f'{tmp}/trace.jsonl', 'w') as file:
+                file.write('\n'.join(json.dumps(s) for s in spans))
+            out = StringIO()
+            call_command('export_trace', f'{tmp}/trace.jsonl',
+                         f'{tmp}/trace.json', trace='a', stdout=out)
+            with open(f'{tmp}/trace.json') as file:
+                events = json.load(file)['traceEvents']
+        self.assertEqual(out.getvalue().strip(), '1 spans exported')
+        self.assertEqual(events, [{
+            'name': 'run', 'cat': 'scraper', 'ph': 'X', 'ts': 1500000,
+            'dur': 250000, 'pid': 1, 'tid': 2,
+            'args': {'trace': 'a', 'thread': 'MainThread',
+                     'kind': 'forecast'}}])
+
+
+class CompactForecastsTestCase(TestCase):
+    fixtures = ["test_db"]
+
+    def test_forecasts_compacted(self):
+        template = ForecastTemplate.objects.get(id=5)
+        start = template.location.start_forecast_datetime()
+        scraped_datetimes = [
+            template.location.local_datetime() - timedelta(hours=h)
+            for h in range(2)]
+        for scraped_datetime in scraped_datetimes:
+            Forecast.bulk_upsert(template, [
+                (start + timedelta(hours=h), [h, 750, 2])
+                for h in range(24)], scraped_datetime)
+        forecasts = Forecast.scraped(template, scraped_datetimes[0])
+
+        out = StringIO()
+        call_command('compact_forecasts', '--delete', stdout=out)
+        self.assertEqual(
+            out.getvalue(), "48 forecast records compacted to 2 scrapes.\n")
+        self.assertFalse(Forecast.objects.exists())
+        self.assertEqual(ForecastScrape.objects.count(), 2)
+        self.assertEqual(
+            ForecastScrape.scraped(template, scraped_datetimes[0]),
+            forecasts)
+
+
+class ScrapeWorkerTestCase(TestCase):
+    fixtures = ["test_db"]
+
+    def test_failing_job_does_not_stop_worker(self):
+        ScrapeJob.enqueue(ScrapeJob.FORECAST, [1, 2])
+        with patch.object(ScrapeJob, 'run', autospec=True,
+                          side_effect=lambda job, scrape_run:
+                          job.template_id == 2 or 1 / 0):
+            call_command('scrape_worker', batch=2, once=True)
+        # Failed job is kept for retry, succeeded one is deleted
+        job = ScrapeJob.objects.get()
+        self.assertEqual((job.template_id, job.leased_by), (1, ''))
+
+    def test_jobs_of_batch_in_one_run(self):
+        ScrapeJob.enqueue(ScrapeJob.FORECAST, [1, 2])
+        with patch.object(ForecastTemplate, 'run_template_scraper',
+                          return_value=True) as run_template_scraper:
+            call_command('scrape_worker', batch=2, once=True)
+        scrape_run = ScrapeRun.objects.get()
+        self.assertIsNotNone(scrape_run.finished)
+        self.assertEqual(
+            [call.kwargs for call in run_template_scraper.call_args_list],
+            [{'scrape_run': scrape_run}] * 2)
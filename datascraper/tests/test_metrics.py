@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase, TestCase
+from datascraper.metrics import Registry, dump_metrics, observe_view
+from datascraper.models import Location
+from django.http import HttpResponse
+from unittest.mock import patch
+from pathlib import Path
+import tempfile
+
+
+class RegistryTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_rendered_by_labels(self):
+        counter = self.registry.counter('rows_total', 'Rows.')
+        self.assertIs(self.registry.counter('rows_total'), counter)
+        counter.inc(3, template=2)
+        counter.inc(template=2)
+        counter.inc(template='a"b')
+        self.assertEqual(self.registry.render(), (
+            '# HELP rows_total Rows.\n'
+            '# TYPE rows_total counter\n'
+            'rows_total{template="2"} 4\n'
+            'rows_total{template="a\\"b"} 1\n'))
+
+    def test_histogram_buckets_cumulative(self):
+        histogram = self.registry.histogram(
+            'fetch_seconds', buckets=(0.5, 1))
+        for value in (0.25, 0.5, 4):
+            histogram.observe(value, host='rp5.ru')
+        self.assertEqual(histogram.samples(), [
+            ('fetch_seconds_bucket', (('host', 'rp5.ru'), ('le', 0.5)), 2),
+            ('fetch_seconds_bucket', (('host', 'rp5.ru'), ('le', 1)), 2),
+            ('fetch_seconds_bucket', (('host', 'rp5.ru'), ('le', '+Inf')),
+             3),
+            ('fetch_seconds_sum', (('host', 'rp5.ru'),), 4.75),
+            ('fetch_seconds_count', (('host', 'rp5.ru'),), 3)])
+        self.assertEqual(self.registry.report(), 'fetch_seconds'
+                         '{host="rp5.ru"}: 3 times, mean 1.583, total 4.750')
+
+    def test_histogram_time(self):
+        histogram = self.registry.histogram('parse_seconds')
+        with self.assertRaises(ValueError):
+            with histogram.time(scraper='rp5'):
+                raise ValueError
+        self.assertEqual(histogram.samples()[-1][2], 1)
+
+    def test_dump_metrics_writes_file(self):
+        self.registry.counter('runs_total').inc()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'scraper.prom'
+            with patch('datascraper.metrics.METRICS', self.registry), \
+                    patch('datascraper.metrics.METRICS_FILE', str(path)):
+                self.assertEqual(dump_metrics(lambda: 1)(), 1)
+            self.assertIn('runs_total 1', path.read_text())
+
+
+class ObserveViewTestCase(TestCase):
+
+    def test_queries_counted(self):
+
+        @observe_view
+        def view(request):
+            list(Location.objects.all())
+            list(Location.objects.all())
+            return HttpResponse()
+
+        with patch('datascraper.metrics.REQUEST_QUERIES') as queries, \
+                patch('datascraper.metrics.REQUEST_SECONDS'):
+            view(None)
+        queries.observe.assert_called_once_with(2, view='view')
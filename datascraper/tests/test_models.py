@@ -7,14 +7,30 @@ from datascraper.models import (
     ForecastSource,
     ForecastTemplate,
     Forecast,
+    ForecastScrape,
+    forecast_storage,
     ArchiveSource,
     ArchiveTemplate,
-    Archive)
-from datascraper.forecasts import BaseForecastScraper
+    Archive,
+    ArchiveWatermark,
+    ScrapeJob,
+    ScrapeRun)
+from datascraper.forecasts import BaseForecastScraper, rp5, foreca
+from datascraper.fetcher import Page
+from datascraper.recorder import FixtureStore
+from datascraper.breaker import BREAKERS, CLOSED
+from datascraper.tests.pages import wikipedia_timezones_page, rp5_page
+from unittest.mock import patch
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.conf import settings
+from django.test import override_settings
 from zoneinfo import ZoneInfo
 from datetime import timedelta
+import asyncio
+import tempfile
+import json
+import requests
 
 
 class ValidateFirstUpperTestCase(TestCase):
@@ -29,6 +45,22 @@ class DatascraperTestBase(TestCase):
 
 class TimeZoneTestCase(TestCase):
 
+    def setUp(self):
+        # Wikipedia page is replayed from fixture store
+        with open(settings.BASE_DIR / 'test_db.json') as file:
+            names = [record['fields']['name'] for record in json.load(file)
+                     if record['model'] == 'datascraper.timezone']
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        store = FixtureStore(self.root.name, mode='record')
+        store.save(
+            'https://en.wikipedia.org/wiki/List_of_tz_database_time_zones',
+            None, wikipedia_timezones_page(names))
+        store.use()
+        fixtures = patch('datascraper.forecasts.FIXTURES', store)
+        fixtures.start()
+        self.addCleanup(fixtures.stop)
+
     def test_timezones_list(self):
         TimeZone.scrap_zones()
         tz_list = TimeZone.zones_list()
@@ -110,6 +142,263 @@ class ForecastTemplateTestCase(DatascraperTestBase):
     def test_forecast_template_check_expiration(self):
         self.assertTrue(ForecastTemplate.check_expiration())
 
+    def test_expiration_report_single_query(self):
+        template = ForecastTemplate.objects.all()[0]
+        Forecast.objects.create(
+            forecast_template=template, scraped_datetime=timezone.now(),
+            forecast_datetime=timezone.now(), prediction_range_hours=1,
+            forecast_data=[])
+        with self.assertNumQueries(1):
+            report = ForecastTemplate.expiration_report()
+        sources = {source: (outdated, total)
+                   for source, outdated, total in report}
+        total = ForecastTemplate.objects.filter(
+            forecast_source=template.forecast_source).count()
+        self.assertEqual(
+            sources[template.forecast_source], (total - 1, total))
+        self.assertEqual(sum(r[1] for r in report),
+                         ForecastTemplate.objects.count() - 1)
+
+
+class ForecastTemplateConditionalFetchTestCase(DatascraperTestBase):
+
+    page = '<html><body><div id="ftab_content">{}</div></body></html>'
+
+    def setUp(self):
+        BREAKERS.reset()
+        self.template = ForecastTemplate.objects.get(id=5)
+        Forecast.objects.create(
+            forecast_template=self.template,
+            scraped_datetime=self.template.last_scraped,
+            forecast_datetime=self.template.last_scraped,
+            prediction_range_hours=1,
+            forecast_data=[1, 750, 2])
+
+    def page_unchanged(self, page):
+        with patch('datascraper.fetcher.fetch_page', return_value=page):
+            return self.template.page_unchanged(rp5)
+
+    def test_content_hash(self):
+        page = Page(200, self.page.format('+1'), '"v1"', '')
+        self.assertFalse(self.page_unchanged(page))
+        self.assertEqual(self.template.etag, '"v1"')
+        self.assertEqual(
+            self.template.validators(), {'If-None-Match': '"v1"'})
+        self.assertTrue(self.page_unchanged(page))
+        self.assertFalse(self.page_unchanged(
+            Page(200, self.page.format('+2'), '', '')))
+        # Multi-page scraper isn't checked by first page
+        self.assertEqual(foreca.content_hash(page.text), '')
+
+    def test_not_modified(self):
+        self.assertTrue(self.page_unchanged(Page(304, '', '', '')))
+
+    def test_replay_offline(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        store = FixtureStore(root.name, mode='record')
+        store.save(self.template.url, None,
+                   rp5_page(self.template.location.local_datetime()))
+        store.use()
+        with patch('datascraper.forecasts.FIXTURES', store), \
+                patch('datascraper.fetcher.fetch_page') as fetch_page:
+            self.assertTrue(self.template.run_template_scraper())
+        fetch_page.assert_not_called()
+
+    def test_bump_freshness(self):
+        last_scraped = self.template.last_scraped
+        local_datetime = self.template.location.local_datetime()
+        self.assertTrue(self.template.bump_freshness(local_datetime))
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.last_checked, local_datetime)
+        self.assertTrue(self.template.is_actual())
+        # Scraped datetime and lead time of forecasts are kept
+        self.assertEqual(self.template.last_scraped, last_scraped)
+        forecast = Forecast.objects.get(forecast_template=self.template)
+        self.assertEqual(forecast.scraped_datetime, last_scraped)
+        self.assertTrue(forecast.is_actual())
+        Forecast.objects.all().delete()
+        self.assertFalse(self.template.bump_freshness(local_datetime))
+
+
+class ForecastBulkUpsertTestCase(DatascraperTestBase):
+
+    def test_bulk_upsert(self):
+        template = ForecastTemplate.objects.get(id=5)
+        local_datetime = template.location.local_datetime().replace(
+            minute=10)
+        start = template.location.start_forecast_datetime()
+        scraped_forecasts = [
+            (start + timedelta(hours=h), [h, 750, 2]) for h in range(48)]
+
+        self.assertEqual(Forecast.bulk_upsert(
+            template, scraped_forecasts, local_datetime), (48, 0))
+        forecast = Forecast.objects.get(
+            forecast_template=template, forecast_datetime=start)
+        self.assertEqual(forecast.prediction_range_hours, 1)
+
+        scraped_forecasts[0] = (start, [-1, 750, 2])
+        scraped_forecasts.append((start + timedelta(hours=48), [0, 0, 0]))
+        self.assertEqual(Forecast.bulk_upsert(
+            template, scraped_forecasts, local_datetime), (1, 48))
+        forecast.refresh_from_db()
+        self.assertEqual(forecast.forecast_data, [-1, 750, 2])
+        self.assertEqual(
+            Forecast.objects.filter(forecast_template=template).count(), 49)
+
+        # Later scrape of the same hour replaces earlier one
+        later = local_datetime + timedelta(minutes=30)
+        self.assertEqual(Forecast.bulk_upsert(
+            template, scraped_forecasts, later), (0, 49))
+        self.assertEqual(set(Forecast.objects.filter(
+            forecast_template=template).values_list(
+            'scraped_datetime', flat=True)), {later})
+
+
+class ForecastScrapeTestCase(DatascraperTestBase):
+
+    def setUp(self):
+        self.template = ForecastTemplate.objects.get(id=5)
+        self.local_datetime = self.template.location.local_datetime()
+        self.start = self.template.location.start_forecast_datetime()
+        # Three-hourly steps with missing values, as some sources give
+        self.scraped_forecasts = [
+            (self.start + timedelta(hours=h), [h / 2, 1013.2, None])
+            for h in range(0, 72, 3)]
+
+    def test_bulk_upsert(self):
+        self.assertEqual(ForecastScrape.bulk_upsert(
+            self.template, self.scraped_forecasts, self.local_datetime),
+            (24, 0))
+        scrape = ForecastScrape.objects.get(forecast_template=self.template)
+        self.assertEqual(scrape.hours, 70)
+        self.assertEqual(scrape.parameters, 3)
+        self.assertEqual(len(scrape.data), 3 * 70 * 4)
+
+        self.scraped_forecasts[0] = (self.start, [-1, 750, 2])
+        self.assertEqual(ForecastScrape.bulk_upsert(
+            self.template, self.scraped_forecasts, self.local_datetime),
+            (0, 24))
+        self.assertEqual(ForecastScrape.objects.count(), 1)
+        self.assertEqual(ForecastScrape.scraped(
+            self.template, self.local_datetime)[self.start], [-1, 750, 2])
+
+        # Scrape of another hour is kept separately
+        ForecastScrape.bulk_upsert(
+            self.template, self.scraped_forecasts,
+            self.local_datetime - timedelta(hours=1))
+        self.assertEqual(ForecastScrape.objects.count(), 2)
+        # Another scrape of the same hour replaces it
+        self.assertEqual(ForecastScrape.bulk_upsert(
+            self.template, self.scraped_forecasts,
+            self.local_datetime.replace(minute=0, second=0, microsecond=1)),
+            (0, 24))
+        self.assertEqual(ForecastScrape.objects.count(), 2)
+
+    def test_storages_read_alike(self):
+        for storage in (Forecast, ForecastScrape):
+            for hours_ago in range(3):
+                storage.bulk_upsert(
+                    self.template, self.scraped_forecasts,
+                    self.local_datetime - timedelta(hours=hours_ago))
+
+        self.assertEqual(
+            ForecastScrape.scraped(self.template, self.local_datetime),
+            Forecast.scraped(self.template, self.local_datetime))
+        self.assertEqual(
+            ForecastScrape.history(self.template, self.start - timedelta(1)),
+            Forecast.history(self.template, self.start - timedelta(1)))
+        for prediction_range in (1, 4, 30):
+            self.assertEqual(
+                ForecastScrape.lead_range(
+                    self.template, prediction_range, self.start,
+                    self.start + timedelta(days=2)),
+                Forecast.lead_range(
+                    self.template, prediction_range, self.start,
+                    self.start + timedelta(days=2)))
+        self.assertEqual(
+            list(ForecastScrape.lead_range(
+                self.template, 4, self.start, self.start + timedelta(1))),
+            [self.start + timedelta(hours=3)])
+
+    @override_settings(FORECAST_STORAGE='compact')
+    def test_compact_storage(self):
+        self.assertIs(forecast_storage(), ForecastScrape)
+        self.template.last_scraped = self.local_datetime
+        self.template.save()
+        ForecastScrape.bulk_upsert(
+            self.template, self.scraped_forecasts, self.local_datetime)
+        template = ForecastTemplate.with_last_forecast().get(
+            id=self.template.id)
+        self.assertEqual(template.last_forecast, self.local_datetime)
+        self.assertFalse(template.is_outdated())
+
+        now = self.template.location.local_datetime()
+        self.assertTrue(self.template.bump_freshness(now))
+        self.assertEqual(self.template.last_checked, now)
+        self.assertTrue(ForecastScrape.objects.filter(
+            scraped_datetime=self.local_datetime).exists())
+
+
+class ForecastTemplateScrapeIntervalTestCase(DatascraperTestBase):
+
+    def setUp(self):
+        self.template = ForecastTemplate.objects.get(id=5)
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def scrape_history(self, template, scrapes, change_every, step=1):
+        """Scrapes every `step` hours, forecasts change every
+        `change_every` scrapes."""
+        for i in range(scrapes):
+            scraped_datetime = self.now - timedelta(
+                hours=step * (scrapes - 1 - i))
+            Forecast.bulk_upsert(template, [
+                (self.now + timedelta(hours=h), [i // change_every, 750, 2])
+                for h in range(24)], scraped_datetime)
+
+    def test_learn_scrape_interval(self):
+        self.assertIsNone(self.template.learn_scrape_interval())
+        self.scrape_history(self.template, scrapes=7, change_every=3)
+        self.assertEqual(
+            self.template.learn_scrape_interval(), timedelta(hours=3))
+
+    def test_interval_bounds(self):
+        self.scrape_history(self.template, scrapes=5, change_every=4)
+        self.assertEqual(
+            self.template.learn_scrape_interval(), timedelta(hours=3))
+
+    def test_no_changes_not_learned(self):
+        self.scrape_history(self.template, scrapes=5, change_every=10)
+        self.assertIsNone(self.template.learn_scrape_interval())
+
+    def test_shorter_interval_probed(self):
+        # Every scrape changed, changes may be more often than scrapes
+        self.scrape_history(
+            self.template, scrapes=4, change_every=1, step=2)
+        self.assertEqual(
+            self.template.learn_scrape_interval(), timedelta(hours=1))
+
+    def test_source_median_for_templates_without_history(self):
+        self.scrape_history(self.template, scrapes=5, change_every=2)
+        ForecastTemplate.learn_scrape_intervals()
+        for template in ForecastTemplate.objects.filter(
+                forecast_source=self.template.forecast_source):
+            self.assertEqual(template.interval(), timedelta(hours=2))
+        other = ForecastTemplate.objects.exclude(
+            forecast_source=self.template.forecast_source)[0]
+        self.assertEqual(
+            other.interval(), other.forecast_source.scrape_interval)
+
+    def test_forecast_actual_within_interval(self):
+        self.template.scrape_interval = timedelta(hours=3)
+        self.template.save()
+        forecast = Forecast(
+            forecast_template=self.template,
+            scraped_datetime=timezone.now() - timedelta(hours=2))
+        self.assertTrue(forecast.is_actual())
+        self.template.scrape_interval = None
+        self.assertFalse(forecast.is_actual())
+
 
 class ForecastScraperTestCase(DatascraperTestBase):
 
@@ -138,3 +427,238 @@ class ArchiveTemplateTestCase(DatascraperTestBase):
         self.assertTrue(ArchiveTemplate.run_scraper())
         archive = Archive.objects.all()[17]
         self.assertEqual(str(archive), '')
+
+    def test_async_errors_logged(self):
+        templates = list(ArchiveTemplate.objects.all()[:2])
+
+        def run(template_id, **kwargs):
+            if template_id == templates[0].id:
+                raise ValueError('Page layout changed')
+            return True
+
+        with patch.object(ArchiveTemplate, 'run_template_scraper_isolated',
+                          side_effect=run), \
+                self.assertLogs('Archive scraper', 'ERROR') as logs:
+            asyncio.run(ArchiveTemplate.run_scraper_async(templates, 2, False))
+        self.assertEqual([record.getMessage() for record in logs.records], [
+            f"Template {templates[0].id}: ValueError('Page layout changed')"])
+
+
+class ArchiveBulkIngestTestCase(DatascraperTestBase):
+
+    def test_bulk_ingest(self):
+        template = ArchiveTemplate.objects.get(id=1)
+        start = template.location.start_archive_datetime()
+        records = [
+            (start - timedelta(hours=3*h), [h, 750, 2]) for h in range(10)]
+
+        self.assertEqual(Archive.bulk_ingest(template, records), 10)
+        # Existing records are skipped, no whole history counting
+        records.append((start + timedelta(hours=3), [0, 750, 2]))
+        with self.assertNumQueries(4):
+            self.assertEqual(Archive.bulk_ingest(template, records), 1)
+        self.assertEqual(Archive.objects.get(
+            archive_template=template, record_datetime=start).data_json,
+            [0, 750, 2])
+
+
+class ArchiveWatermarkTestCase(DatascraperTestBase):
+
+    def setUp(self):
+        BREAKERS.reset()
+        self.template = ArchiveTemplate.objects.get(id=1)
+
+    def run_template_scraper(self, pages=iter([[]])):
+        template = ArchiveTemplate.objects.get(id=1)
+        with patch('datascraper.archive.arch_rp5',
+                   return_value=pages) as arch_rp5:
+            template.run_template_scraper()
+        return arch_rp5
+
+    def pages(self, fail=False):
+        """Archive pages newest first, optionally failing after first."""
+        start = self.template.location.start_archive_datetime()
+        yield [(start - timedelta(hours=3*h), [h, 750, 2])
+               for h in range(8)]
+        if fail:
+            raise ConnectionError
+        yield [(start - timedelta(days=1, hours=3*h), [h, 750, 2])
+               for h in range(8)]
+
+    def watermark(self):
+        return ArchiveWatermark.objects.get(
+            archive_template=self.template).last_record_datetime
+
+    def test_watermark_moved_after_all_pages(self):
+        self.run_template_scraper(self.pages())
+        self.assertEqual(
+            self.watermark(), self.template.location.start_archive_datetime())
+        # Older records don't move watermark back
+        ArchiveWatermark.advance(
+            self.template, self.watermark() - timedelta(hours=3))
+        self.assertEqual(
+            self.watermark(), self.template.location.start_archive_datetime())
+
+    def test_back_off_without_new_records(self):
+        for stale_runs in (1, 2):
+            self.run_template_scraper(iter([[]]))
+            self.template.refresh_from_db()
+            self.assertEqual(self.template.stale_runs, stale_runs)
+        self.assertAlmostEqual(
+            self.template.next_attempt, timezone.now() + timedelta(minutes=10),
+            delta=timedelta(seconds=5))
+        self.run_template_scraper(self.pages())
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.stale_runs, 0)
+        self.assertIsNone(self.template.next_attempt)
+
+    def test_failed_backfill_resumed(self):
+        records = Archive.objects.filter(archive_template=self.template)
+        count = records.count()
+        self.run_template_scraper(self.pages(fail=True))
+        # Written page is kept, watermark isn't moved
+        self.assertEqual(records.count(), count + 8)
+        self.assertFalse(ArchiveWatermark.objects.filter(
+            archive_template=self.template).exists())
+
+    def test_recent_watermark_skipped(self):
+        ArchiveWatermark.objects.create(
+            archive_template=self.template,
+            last_record_datetime=timezone.now() - timedelta(hours=1))
+        self.run_template_scraper().assert_not_called()
+
+    def test_scraper_resumed_from_watermark(self):
+        last_record_datetime = timezone.now() - timedelta(hours=5)
+        ArchiveWatermark.objects.create(
+            archive_template=self.template,
+            last_record_datetime=last_record_datetime)
+        arch_rp5 = self.run_template_scraper()
+        self.assertEqual(arch_rp5.call_args.args[2], last_record_datetime)
+
+
+class ScrapeRunTestCase(DatascraperTestBase):
+
+    def setUp(self):
+        BREAKERS.reset()
+
+    def test_template_runs_recorded(self):
+        archive_template = ArchiveTemplate.objects.get(id=1)
+        start = archive_template.location.start_archive_datetime()
+        forecast_template = ForecastTemplate.objects.filter(
+            forecast_source__scraper_class='rp5')[0]
+        scrape_run = ScrapeRun.objects.create(kind=ScrapeRun.ARCHIVE)
+        with patch('datascraper.archive.arch_rp5', return_value=iter([
+                [(start, [0, 750, 2]), (start - timedelta(hours=3),
+                                        [1, 751, 3])]])):
+            self.assertTrue(archive_template.run_template_scraper(
+                scrape_run=scrape_run))
+        with patch('datascraper.fetcher.fetch_page',
+                   side_effect=ConnectionError('Source is down')):
+            self.assertIsNone(forecast_template.run_template_scraper(
+                scrape_run=scrape_run))
+        scrape_run.finish()
+
+        self.assertEqual((scrape_run.templates, scrape_run.failed), (2, 1))
+        archive_run, forecast_run = scrape_run.template_runs.order_by('id')
+        self.assertEqual(archive_run.archive_template, archive_template)
+        self.assertEqual(
+            (archive_run.records_written, archive_run.error), (2, ''))
+        self.assertGreaterEqual(archive_run.total_ms, archive_run.write_ms)
+        self.assertEqual(forecast_run.forecast_template, forecast_template)
+        self.assertEqual(forecast_run.error, 'ConnectionError')
+
+    def test_run_finished_after_crash(self):
+        with patch.object(ForecastTemplate, 'run_template_scraper',
+                          side_effect=RuntimeError('Crash')):
+            with self.assertRaises(RuntimeError):
+                ForecastTemplate.run_scraper()
+        self.assertIsNotNone(ScrapeRun.objects.get().finished)
+
+    def test_not_recorded_without_run(self):
+        with patch('datascraper.archive.arch_rp5', return_value=iter([[]])):
+            ArchiveTemplate.objects.get(id=1).run_template_scraper()
+        self.assertFalse(ScrapeRun.objects.exists())
+
+
+class ScrapeJobTestCase(DatascraperTestBase):
+
+    def test_enqueue_due(self):
+        ForecastTemplate.objects.filter(id=5).update(
+            last_scraped=timezone.now())
+        enqueued = ScrapeJob.enqueue_due()
+        self.assertEqual(enqueued, ForecastTemplate.objects.count() - 1 +
+                         ArchiveTemplate.objects.count())
+        self.assertFalse(ScrapeJob.objects.filter(
+            kind=ScrapeJob.FORECAST, template_id=5).exists())
+        # Queued templates are not duplicated
+        self.assertEqual(ScrapeJob.enqueue_due(), 0)
+
+    def test_lease(self):
+        ScrapeJob.enqueue(ScrapeJob.FORECAST, [1, 2])
+        ScrapeJob.enqueue(ScrapeJob.FORECAST, [3], priority=10)
+        jobs = ScrapeJob.lease('worker-1', batch=2)
+        self.assertEqual([job.template_id for job in jobs], [3, 1])
+        jobs = ScrapeJob.lease('worker-2', batch=2)
+        self.assertEqual([job.template_id for job in jobs], [2])
+        self.assertEqual(ScrapeJob.lease('worker-2'), [])
+        # Job of crashed worker is leased again after expiry
+        ScrapeJob.objects.filter(template_id=2).update(
+            leased_until=timezone.now() - timedelta(seconds=1))
+        job = ScrapeJob.lease('worker-3')[0]
+        self.assertEqual((job.template_id, job.attempts), (2, 2))
+
+    def test_run_and_retry(self):
+        ScrapeJob.enqueue(ScrapeJob.FORECAST, [5])
+        job = ScrapeJob.lease('worker')[0]
+        with patch.object(ForecastTemplate, 'run_template_scraper',
+                          return_value=None):
+            self.assertFalse(job.run())
+        job.fail()
+        job.refresh_from_db()
+        self.assertGreater(job.leased_until, timezone.now())
+        self.assertEqual(ScrapeJob.lease('worker'), [])
+
+        job.attempts = ScrapeJob.MAX_ATTEMPTS
+        job.fail()
+        self.assertFalse(ScrapeJob.objects.exists())
+
+
+class SourceCircuitBreakerTestCase(DatascraperTestBase):
+
+    def setUp(self):
+        BREAKERS.reset()
+        self.templates = ForecastTemplate.objects.filter(
+            forecast_source__scraper_class='rp5')
+
+    def test_templates_of_failing_source_skipped(self):
+        with patch('datascraper.fetcher.fetch_page',
+                   side_effect=requests.ConnectionError('Source is down')) \
+                as fetch:
+            for template in list(self.templates) * 3:
+                self.assertIsNone(template.run_template_scraper())
+        # Circuit is open after 3 failures
+        self.assertEqual(fetch.call_count, 3)
+        self.assertEqual(BREAKERS.get('rp5').skipped,
+                         self.templates.count() * 3 - 3)
+
+    def test_parsing_errors_not_counted(self):
+        with patch('datascraper.fetcher.fetch_page',
+                   side_effect=ValueError('Page layout changed')):
+            for template in list(self.templates) * 3:
+                self.assertIsNone(template.run_template_scraper())
+        self.assertEqual(BREAKERS.get('rp5').state, CLOSED)
+
+    @patch('datascraper.breaker.time.monotonic')
+    def test_half_open_probe_with_parsing_error(self, monotonic):
+        monotonic.return_value = 0
+        breaker = BREAKERS.get('rp5')
+        for _ in range(breaker.failure_threshold):
+            breaker.failure()
+        monotonic.return_value = breaker.reset_timeout
+        template = self.templates[0]
+        with patch('datascraper.fetcher.fetch_page',
+                   side_effect=ValueError('Page layout changed')):
+            self.assertIsNone(template.run_template_scraper())
+        # Probe is finished, templates of source are scraped again
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow())
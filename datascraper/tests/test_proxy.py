@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+from datascraper.proxy import ProxyPool
+from unittest.mock import patch
+
+FAST = ('1.1.1.1', '8000', 'user', 'pass')
+SLOW = ('2.2.2.2', '8000', 'user', 'pass')
+
+
+class ProxyPoolTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = ProxyPool([FAST, SLOW], error_threshold=2,
+                              quarantine=60)
+
+    def test_healthiest_proxy_chosen(self):
+        self.pool.record(FAST, 0.2)
+        # Not measured proxy is tried first
+        self.assertEqual(self.pool.choose(), SLOW)
+        self.pool.record(SLOW, 1.0)
+        self.assertEqual(self.pool.choose(), FAST)
+        # Errors make fast proxy worse than slow one
+        self.pool.record(FAST, 0.2, error=True)
+        self.assertEqual(self.pool.choose(), SLOW)
+
+    @patch('datascraper.proxy.time.monotonic', return_value=100)
+    def test_quarantine(self, monotonic):
+        self.pool.record(SLOW, 1)
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                with self.pool.track(FAST):
+                    raise TimeoutError
+        self.assertEqual(self.pool.choose(), SLOW)
+        self.assertIn('1.1.1.1: 2 requests, 2 errors, latency 0.00 s, '
+                      'quarantined', self.pool.report())
+        # All proxies are quarantined, the first released one is used
+        monotonic.return_value = 110
+        for _ in range(2):
+            with self.pool.track(SLOW) as result:
+                result.error = True
+        self.assertEqual(self.pool.choose(), FAST)
+        monotonic.return_value = 161
+        self.pool.record(FAST, 0.1)
+        self.assertEqual(self.pool.choose(), FAST)
+
+    def test_empty_pool(self):
+        pool = ProxyPool([])
+        self.assertFalse(pool)
+        self.assertIsNone(pool.choose())
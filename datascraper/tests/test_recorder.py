@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+from datascraper.recorder import FixtureStore, FixtureMissing
+from datascraper.forecasts import rp5, get_html
+from datascraper.tests.pages import rp5_page
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from unittest.mock import patch, Mock
+import tempfile
+
+
+class FixtureStoreTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+
+    def test_record_and_replay(self):
+        store = FixtureStore(self.root.name, version='v1', mode='record')
+        download = Mock(return_value='<html>page</html>')
+        self.assertEqual(
+            store.serve('https://rp5.ru/1', None, download), download())
+        store.serve('https://rp5.ru/1', {'pe': '30'}, Mock(
+            return_value='<html>window</html>'))
+
+        store = FixtureStore(self.root.name, mode='replay')
+        self.assertEqual(store.version, 'v1')
+        download = Mock()
+        self.assertEqual(
+            store.serve('https://rp5.ru/1', None, download),
+            '<html>page</html>')
+        self.assertEqual(
+            store.serve('https://rp5.ru/1', {'pe': '30'}, download),
+            '<html>window</html>')
+        download.assert_not_called()
+        with self.assertRaises(FixtureMissing):
+            store.serve('https://rp5.ru/2', None, download)
+
+    def test_latest_version_replayed(self):
+        for version in ('2024-01-02', '2024-01-10'):
+            FixtureStore(self.root.name, version, mode='record').save(
+                'https://rp5.ru/1', None, version)
+        store = FixtureStore(self.root.name, mode='replay')
+        self.assertEqual(store.versions(), ['2024-01-02', '2024-01-10'])
+        self.assertEqual(store.load('https://rp5.ru/1'), '2024-01-10')
+
+    def test_scraper_replayed_offline(self):
+        local_datetime = datetime(
+            2024, 1, 13, 10, tzinfo=ZoneInfo('Europe/Moscow'))
+        url = 'https://rp5.ru/Weather_in_Moscow'
+        store = FixtureStore(self.root.name, mode='record')
+        with patch('datascraper.forecasts.FIXTURES', store), \
+                patch('datascraper.forecasts.fetch_text',
+                      return_value=rp5_page(local_datetime)):
+            get_html(url)
+        store.use()
+        with patch('datascraper.forecasts.FIXTURES', store), \
+                patch('datascraper.forecasts.fetch_text') as fetch_text:
+            scraper = rp5(url, local_datetime=local_datetime,
+                          start_forecast_datetime=local_datetime)
+        fetch_text.assert_not_called()
+        self.assertEqual(len(scraper.get_forecasts()), 5)
@@ -0,0 +1,98 @@
+from django.test import TestCase
+from datascraper.models import ForecastTemplate, ArchiveTemplate
+from datascraper.scheduler import ScrapeScheduler, RETRY_DELAY
+from django.utils import timezone
+from datetime import timedelta
+from unittest.mock import patch, Mock
+from django.db import DatabaseError
+
+
+class ScrapeSchedulerTestCase(TestCase):
+    fixtures = ["test_db"]
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.templates = list(ForecastTemplate.objects.all())
+        # The first template is the most stale one, the last one is fresh
+        for i, template in enumerate(self.templates):
+            template.last_scraped = self.now - timedelta(hours=5 - i)
+            template.save()
+        self.scheduler = ScrapeScheduler(jitter=0.2, archive=False)
+
+    def test_queue_ordered_by_staleness(self):
+        self.scheduler.reload()
+        jobs = self.scheduler.pop_due(self.now)
+        self.assertEqual(jobs[ForecastTemplate], [
+            t.id for t in self.templates
+            if t.last_scraped < self.now - timedelta(minutes=55)])
+        self.assertEqual(jobs[ArchiveTemplate], [])
+        # Fresh templates remain in queue
+        self.assertEqual(
+            len(self.scheduler.queue), len(self.templates) - 5)
+
+    def test_due_templates_rescheduled(self):
+        scraped = self.templates[0]
+
+        def run_template_scraper(template_id, scrape_run=None):
+            # Only the first template is scraped successfully
+            if template_id == scraped.id:
+                ForecastTemplate.objects.filter(id=template_id).update(
+                    last_scraped=timezone.now())
+
+        # Templates are scraped in main thread with test transaction
+        executor = Mock(map=map)
+        with patch.object(ForecastTemplate, 'run_template_scraper_isolated',
+                          side_effect=run_template_scraper), \
+                patch.object(ForecastTemplate, 'check_expiration'):
+            self.assertEqual(self.scheduler.run_once(executor), 5)
+
+        queue = {template_id: due
+                 for due, _, template_id in self.scheduler.queue}
+        self.assertGreater(
+            queue[scraped.id], self.now + timedelta(minutes=44))
+        self.assertAlmostEqual(
+            queue[self.templates[1].id], self.now + RETRY_DELAY,
+            delta=timedelta(seconds=5))
+
+    def test_template_errors_dont_stop_scheduler(self):
+        deleted, failed = self.templates[0], self.templates[1]
+
+        def run_template_scraper(template_id, scrape_run=None):
+            if template_id == deleted.id:
+                ForecastTemplate.objects.filter(id=template_id).delete()
+            raise DatabaseError('Write failed')
+
+        executor = Mock(map=map)
+        with patch.object(ForecastTemplate, 'run_template_scraper_isolated',
+                          side_effect=run_template_scraper), \
+                patch.object(ForecastTemplate, 'check_expiration'):
+            self.assertEqual(self.scheduler.run_once(executor), 5)
+        # All but deleted template are retried
+        queue = {template_id: due
+                 for due, _, template_id in self.scheduler.queue}
+        self.assertNotIn(deleted.id, queue)
+        self.assertEqual(len(queue), len(self.templates) - 1)
+        self.assertAlmostEqual(
+            queue[failed.id], self.now + RETRY_DELAY,
+            delta=timedelta(seconds=5))
+
+    @patch('datascraper.scheduler.signal.signal')
+    def test_loop_survives_errors(self, signal):
+        runs = []
+
+        def run_once(executor):
+            runs.append(executor)
+            if len(runs) == 1:
+                raise DatabaseError('Database is down')
+            self.scheduler.stop()
+
+        with patch.object(self.scheduler, 'run_once', side_effect=run_once), \
+                patch.object(self.scheduler, 'sleep_time', return_value=0):
+            self.scheduler.run()
+        self.assertEqual(len(runs), 2)
+
+    def test_archive_backing_off_not_due(self):
+        template = ArchiveTemplate.objects.select_related('watermark')[0]
+        self.assertLessEqual(self.scheduler.due(template), timezone.now())
+        template.next_attempt = self.now + timedelta(hours=2)
+        self.assertEqual(self.scheduler.due(template), template.next_attempt)
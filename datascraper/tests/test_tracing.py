@@ -0,0 +1,97 @@
+from django.test import SimpleTestCase, TestCase
+from datascraper.tracing import TRACER, span, traced, propagate, chrome_trace
+from datascraper.models import ArchiveTemplate
+from datascraper.breaker import BREAKERS
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from pathlib import Path
+import tempfile
+import json
+
+
+class TracingTestBase():
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'trace.jsonl'
+        TRACER.use(str(self.path))
+
+    def tearDown(self):
+        TRACER.use('')
+        self.tmp.cleanup()
+
+    def spans(self):
+        return {s['name']: s for s in map(
+            json.loads, self.path.read_text().splitlines())}
+
+
+class SpanTestCase(TracingTestBase, SimpleTestCase):
+
+    def test_spans_nested(self):
+
+        @traced('parse')
+        def parse():
+            pass
+
+        with span('template', id=1):
+            with span('fetch', url='https://rp5.ru/'):
+                pass
+            parse()
+        spans = self.spans()
+        self.assertEqual(spans['fetch']['parent'], spans['template']['span'])
+        self.assertEqual(spans['parse']['trace'], spans['template']['span'])
+        self.assertIsNone(spans['template']['parent'])
+        self.assertEqual(spans['fetch']['attrs'], {'url': 'https://rp5.ru/'})
+
+    def test_error_recorded(self):
+        with self.assertRaises(ValueError):
+            with span('parse'):
+                raise ValueError
+        self.assertEqual(self.spans()['parse']['attrs'],
+                         {'error': 'ValueError'})
+
+    def test_executor_threads_nested(self):
+
+        def fetch(i):
+            with span(f'fetch {i}'):
+                pass
+
+        with span('run'):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(propagate(fetch), range(3)))
+        spans = self.spans()
+        self.assertEqual(
+            {spans[f'fetch {i}']['parent'] for i in range(3)},
+            {spans['run']['span']})
+
+    def test_disabled(self):
+        TRACER.use('')
+        with span('run') as run:
+            self.assertIsNone(run)
+        self.assertFalse(self.path.exists())
+
+    def test_chrome_trace(self):
+        with span('run'):
+            pass
+        event = chrome_trace(self.spans().values())['traceEvents'][0]
+        self.assertEqual((event['name'], event['ph']), ('run', 'X'))
+        self.assertGreaterEqual(event['dur'], 0)
+
+
+class ArchiveTracingTestCase(TracingTestBase, TestCase):
+    fixtures = ["test_db"]
+
+    def setUp(self):
+        super().setUp()
+        BREAKERS.reset()
+
+    def test_template_stages_traced(self):
+        template = ArchiveTemplate.objects.get(id=1)
+        start = template.location.start_archive_datetime()
+        with patch('datascraper.archive.arch_rp5',
+                   return_value=iter([[(start, [0, 750, 2])]])):
+            template.run_template_scraper()
+        spans = self.spans()
+        self.assertEqual(spans['template']['attrs'],
+                         {'model': 'ArchiveTemplate', 'id': 1})
+        self.assertEqual(spans['write']['parent'], spans['template']['span'])
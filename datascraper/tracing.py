@@ -0,0 +1,135 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Spans are written to this JSON lines file, tracing is off if not set
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+
+# Span of current context, parent of new spans
+CURRENT_SPAN = contextvars.ContextVar('current_span', default=None)
+
+
+class Span():
+    """Timed stage of scraping pipeline, e.g. run, template, fetch."""
+
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.id = os.urandom(8).hex()
+        self.parent_id = parent.id if parent else None
+        # Trace is identified by its root span
+        self.trace_id = parent.trace_id if parent else self.id
+        self.attrs = attrs
+        self.start = time.time()
+        self.clock = time.perf_counter()
+        self.duration = None
+        self.thread = threading.current_thread().name
+        self.tid = threading.get_ident()
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self.clock
+        if error:
+            self.attrs['error'] = type(error).__name__
+
+    def as_dict(self):
+        return {
+            'trace': self.trace_id, 'span': self.id,
+            'parent': self.parent_id, 'name': self.name,
+            'start': self.start, 'duration': self.duration,
+            'pid': os.getpid(), 'tid': self.tid, 'thread': self.thread,
+            'attrs': self.attrs}
+
+
+class Tracer():
+    """Writer of finished spans to JSON lines file."""
+
+    def __init__(self, path=''):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def use(self, path):
+        """Switch output to path, empty path turns tracing off."""
+        with self.lock:
+            if self.file:
+                self.file.close()
+            self.path = path
+            self.file = None
+
+    def emit(self, span):
+        line = json.dumps(span.as_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            if not self.file:
+                self.file = open(self.path, 'a', buffering=1)
+            self.file.write(line + '\n')
+
+
+TRACER = Tracer(TRACE_FILE)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Span nested in span of current context.
+
+    Does nothing if tracing is off, so it is cheap in hot paths.
+    """
+    if not TRACER.enabled:
+        yield None
+        return
+    new_span = Span(name, CURRENT_SPAN.get(), **attrs)
+    token = CURRENT_SPAN.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.finish(e)
+        raise
+    else:
+        new_span.finish()
+    finally:
+        CURRENT_SPAN.reset(token)
+        TRACER.emit(new_span)
+
+
+def traced(name, **attrs):
+    """Decorator running function in span."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func):
+    """Func running in a copy of current context, for executor threads.
+
+    Spans started in threads of ThreadPoolExecutor.map are nested in
+    the span of submitting code.
+    """
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Context can't be entered by several threads at once
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def chrome_trace(spans):
+    """Spans dicts as Chrome trace-event JSON (chrome://tracing,
+    Perfetto), complete events in microseconds."""
+    return {'traceEvents': [{
+        'name': s['name'], 'cat': 'scraper', 'ph': 'X',
+        'ts': round(s['start'] * 1e6), 'dur': round(s['duration'] * 1e6),
+        'pid': s['pid'], 'tid': s['tid'],
+        'args': {'trace': s['trace'], 'thread': s['thread'], **s['attrs']}}
+        for s in spans]}
@@ -190,5 +190,23 @@ MEDIA_URL = '/media/'
 
 CSRF_TRUSTED_ORIGINS = ['http://localhost:1337']
 
+# Scrapers politeness limits per source host: requests per second (rate),
+# burst size and maximum number of simultaneous requests (max_in_flight)
+SCRAPER_HOST_LIMITS = {
+    'default': {'rate': 1, 'burst': 3, 'max_in_flight': 4},
+    'rp5.ru': {'rate': 1, 'burst': 3, 'max_in_flight': 4},
+    'foreca.ru': {'rate': 2, 'burst': 5, 'max_in_flight': 4},
+    'meteoinfo.ru': {'rate': 1, 'burst': 2, 'max_in_flight': 2},
+    'yandex.ru': {'rate': 0.5, 'burst': 1, 'max_in_flight': 2},
+}
+
+# Hosts allowed to read metrics of web process without login, e.g.
+# Prometheus scraping backend directly (not through nginx)
+INTERNAL_IPS = os.environ.get("INTERNAL_IPS", "127.0.0.1").split(" ")
+
+# Storage of scraped forecasts: 'rows' is record per forecast hour
+# (Forecast model), 'compact' is record per scrape (ForecastScrape model)
+FORECAST_STORAGE = os.environ.get("FORECAST_STORAGE", "rows")
+
 # SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 # CSRF_TRUSTED_ORIGINS = os.environ.get("CSRF_TRUSTED_ORIGINS").split(" ")
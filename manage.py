@@ -2,11 +2,16 @@
 """Django's command-line utility for administrative tasks."""
 import os
 import sys
+import tempfile
 
 
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
+    if sys.argv[1:2] == ['test']:
+        # Test runs don't write to log file of scrapers
+        os.environ.setdefault('LOG_FILE', os.path.join(
+            tempfile.gettempdir(), 'datascraper-test.log'))
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
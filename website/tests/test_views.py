@@ -4,19 +4,44 @@ from website.views import (
     check_int_input
 )
 from django.urls import reverse
+from django.test import override_settings
+from django.core.cache import cache
 from datascraper.models import (
     ForecastTemplate,
     ArchiveTemplate,
     Archive,
     Location,
-    Forecast)
+    Forecast,
+    ForecastScrape)
 from datetime import datetime, timedelta
+from django.conf import settings
+import subprocess
+import sys
 
 
 class WebsiteTestBase(TestCase):
     fixtures = ["test_db"]
 
 
+def storages_datasets(test, url_name, scraped_datetime, scraped_forecasts):
+    """Datasets of view for the same forecasts in every storage."""
+    template = ForecastTemplate.objects.filter(
+        location__name='Saint-Petersburg')[0]
+    template.last_scraped = scraped_datetime
+    template.save()
+    datasets = []
+    for storage in (Forecast, ForecastScrape):
+        storage.bulk_upsert(template, scraped_forecasts, scraped_datetime)
+        with override_settings(FORECAST_STORAGE=(
+                'compact' if storage is ForecastScrape else 'rows')):
+            response = test.client.get(reverse(url_name))
+        datasets.append([
+            dataset['data'] for dataset in
+            response.context['chartjs_data']['datasets']
+            if dataset['label'] == template.forecast_source.name])
+    return datasets
+
+
 class ForecastViewTest(WebsiteTestBase):
 
     def test_view_url_exists_at_desired_location(self):
@@ -51,6 +76,16 @@ class ForecastViewTest(WebsiteTestBase):
             response.context['chartjs_data']['datasets'][0]['label'],
             'RP5')
 
+    def test_view_storages(self):
+        location = Location.objects.get(name='Saint-Petersburg')
+        start = location.start_forecast_datetime()
+        rows, compact = storages_datasets(
+            self, 'website:forecast', location.local_datetime(),
+            [(start + timedelta(hours=h), [h / 2, 750, 2])
+             for h in range(0, 48, 3)])
+        self.assertEqual(rows, compact)
+        self.assertEqual(compact[0][:4], [0, 'none', 'none', 1.5])
+
     def test_view_location_without_template(self):
         location = Location.objects.create(
             name='Gotham',
@@ -102,6 +137,19 @@ class ArchiveViewTest(WebsiteTestBase):
         self.assertEqual(
             response.context['chartjs_data']['datasets'][1]['label'], 'RP5')
 
+    def test_view_storages(self):
+        # Forecasts made 24 hours ago, default prediction range
+        scraped_datetime = Location.objects.get(
+            name='Saint-Petersburg').local_datetime() - timedelta(hours=24)
+        start = scraped_datetime.replace(
+            minute=0, second=0, microsecond=0) + timedelta(hours=24)
+        rows, compact = storages_datasets(
+            self, 'website:archive', scraped_datetime,
+            [(start + timedelta(hours=h), [-3.5, 750, 2])
+             for h in range(3)])
+        self.assertEqual(rows, compact)
+        self.assertIn(-3.5, compact[0])
+
 
 class FeedbackViewTest(WebsiteTestBase):
 
@@ -115,6 +163,45 @@ class FeedbackViewTest(WebsiteTestBase):
         self.assertEqual(response.status_code, 302)
 
 
+class HealthViewTest(WebsiteTestBase):
+
+    def setUp(self):
+        cache.delete('health_report')
+
+    def test_outdated_forecasts_reported(self):
+        response = self.client.get(reverse('website:health'))
+        self.assertEqual(response.status_code, 503)
+        data = response.json()
+        self.assertEqual(data['status'], 'outdated')
+        self.assertEqual(
+            sum(source['outdated'] for source in data['outdated']),
+            ForecastTemplate.objects.count())
+
+    def test_report_cached(self):
+        response = self.client.get(reverse('website:health'))
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('website:health'))
+        self.assertEqual(cached.json(), response.json())
+
+
+class MetricsViewTest(WebsiteTestBase):
+
+    def test_view_metrics_exposed(self):
+        self.client.get(reverse('website:forecast'))
+        response = self.client.get(reverse('website:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, 'web_request_db_queries_count{view="forecast"}')
+
+    def test_view_metrics_restricted(self):
+        external = {'REMOTE_ADDR': '203.0.113.1'}
+        response = self.client.get(reverse('website:metrics'), **external)
+        self.assertEqual(response.status_code, 403)
+        self.client.login(username='anton', password='#ASDF2023')
+        response = self.client.get(reverse('website:metrics'), **external)
+        self.assertEqual(response.status_code, 200)
+
+
 class MiscTest(WebsiteTestBase):
 
     def test_check_int_input(self):
@@ -324,3 +411,18 @@ class ArchiveTemplateWizardTest(WebsiteTestBase):
         self.assertEqual(response.status_code, 200)
         self.assertInHTML("Archive Template successfully created.",
                           response.content.decode())
+
+
+class ImportGraphTest(TestCase):
+
+    def test_scraping_stack_not_loaded_by_web(self):
+        modules = ['selenium', 'aiohttp', 'fake_useragent', 'lxml', 'bs4',
+                   'datascraper.forecasts', 'datascraper.fetcher']
+        code = (
+            "import django, importlib, sys; django.setup(); "
+            f"importlib.import_module('{settings.ROOT_URLCONF}'); "
+            f"print([m for m in {modules} if m in sys.modules])")
+        loaded = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout
+        self.assertEqual(loaded.strip().splitlines()[-1], '[]')
@@ -11,6 +11,8 @@ urlpatterns = [
     path('archive/', views.archive, name="archive"),
     path('feedback/', views.feedback, name="feedback"),
     path('idea/', views.idea, name="idea"),
+    path('health/', views.health, name="health"),
+    path('metrics/', views.metrics, name="metrics"),
     path('create_new_source/', views.create_new_source,
          name="create_new_source"),
     path('add_location/', views.LocationCreateView.as_view(),
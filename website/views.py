@@ -1,8 +1,8 @@
 from django.shortcuts import render, redirect, reverse
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from datascraper.models import (
-    WeatherParameter, Location, ForecastTemplate, Forecast,
-    ArchiveTemplate, Archive, ArchiveSource)
+    WeatherParameter, Location, ForecastTemplate, ArchiveTemplate, Archive,
+    ArchiveSource, forecast_storage)
 from zoneinfo import ZoneInfo
 from django.utils import timezone
 from datetime import timedelta, datetime
@@ -12,17 +12,23 @@ from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.views.generic import CreateView
 from formtools.wizard.views import SessionWizardView
 from website import forms
-from datascraper import forecasts
-from datascraper.archive import arch_rp5
 from django.utils.html import format_html
-from django.http import HttpResponse
+from django.http import (
+    HttpResponse, HttpResponseForbidden, JsonResponse)
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth.decorators import login_required
+from datascraper.metrics import METRICS, observe_view
 
 
 WEATHER_PARAMETERS = [
     f'{par.name}, {par.meas_unit}' for par in WeatherParameter.objects.all()]
 
+# Seconds the health report is cached for
+HEALTH_CACHE_SECONDS = 30
 
+
+@observe_view
 def forecast(request):
     """Main view. Weather forecasts on the Chartjs graph."""
 
@@ -75,22 +81,20 @@ def forecast(request):
 
     # Making datasets for Chartjs
     datasets = []
+    storage = forecast_storage()
     for template in forecast_templates:
 
-        forecasts = Forecast.objects.filter(
-            scraped_datetime=template.last_scraped,
-            forecast_template=template)
+        forecasts = storage.scraped(template, template.last_scraped)
 
-        if not forecasts or not forecasts[0].is_actual():
+        if not forecasts or not template.is_actual():
             continue
 
         forecast_data = []
         for datetime_ in datetime_row:
             try:
-                forecast_record = forecasts.get(
-                    forecast_datetime=datetime_).forecast_data[
-                        weather_parameter_index]
-            except (ObjectDoesNotExist, MultipleObjectsReturned):
+                forecast_record = forecasts[datetime_][
+                    weather_parameter_index]
+            except (KeyError, IndexError):
                 forecast_record = 'none'
 
             if not forecast_record and forecast_record != 0:
@@ -143,6 +147,7 @@ def forecast(request):
         context=context)
 
 
+@observe_view
 def archive(request):
     """Weather archive on the graph."""
 
@@ -237,12 +242,11 @@ def archive(request):
             'pointHoverRadius': 10,
         })
 
+    storage = forecast_storage()
     for template in forecast_templates:
 
-        forecasts = Forecast.objects.filter(
-            forecast_template=template,
-            prediction_range_hours=prediction_range,
-            forecast_datetime__range=(datetime_row[0], datetime_row[-1]))
+        forecasts = storage.lead_range(
+            template, prediction_range, datetime_row[0], datetime_row[-1])
 
         if not forecasts:
             # prediction_range += 1
@@ -251,10 +255,9 @@ def archive(request):
         forecast_data = []
         for datetime_ in datetime_row:
             try:
-                forecast_record = forecasts.get(
-                    forecast_datetime=datetime_).forecast_data[
-                        weather_parameter_index]
-            except (ObjectDoesNotExist, MultipleObjectsReturned):
+                forecast_record = forecasts[datetime_][
+                    weather_parameter_index]
+            except (KeyError, IndexError):
                 forecast_record = 'none'
 
             if not forecast_record and forecast_record != 0:
@@ -306,6 +309,36 @@ def archive(request):
         request=request, template_name='website/archive.html', context=context)
 
 
+def health(request):
+    """Freshness of scraped forecasts, 503 status if outdated."""
+    # Frequent probes don't run the report query on every hit
+    exp_report = cache.get_or_set(
+        'health_report', lambda: [
+            (source.name, outdated, total) for source, outdated, total
+            in ForecastTemplate.expiration_report()],
+        HEALTH_CACHE_SECONDS)
+    return JsonResponse({
+        'status': 'outdated' if exp_report else 'ok',
+        'outdated': [
+            {'source': source, 'templates': total, 'outdated': outdated}
+            for source, outdated, total in exp_report]},
+        status=503 if exp_report else 200)
+
+
+def metrics(request):
+    """Metrics of web process in Prometheus text format.
+
+    Metrics are kept in memory of the process, so web server runs single
+    worker (see infra docker-compose files). Exposed to staff users and
+    hosts of INTERNAL_IPS only, e.g. Prometheus scraping backend directly.
+    """
+    if not request.user.is_staff and \
+            request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        METRICS.render(), content_type='text/plain; version=0.0.4')
+
+
 def feedback(request):
     """Feedback theme on the Forum view."""
     feedback_topic_pk = Topic.objects.get(title='Users Feedbacks').pk
@@ -404,6 +437,8 @@ class ForecastTemplateWizard(PermissionRequiredMixin, SessionWizardView):
                     forecast_source=forecast_source)[0].url})
 
         elif self.steps.current == 'f3':
+            # Scraping stack is loaded only for the preview
+            from datascraper import forecasts
             scraper_class = getattr(forecasts, forecast_source.scraper_class)
             url = self.get_cleaned_data_for_step('f2').get('url')
             location = self.get_cleaned_data_for_step('f1').get('location')
@@ -504,11 +539,14 @@ class ArchiveTemplateWizard(PermissionRequiredMixin, SessionWizardView):
                     archive_source=archive_source)[0].url})
 
         elif self.steps.current == 'a3':
+            from datascraper.archive import arch_rp5
             url = self.get_cleaned_data_for_step('a2').get('url')
             location = self.get_cleaned_data_for_step('a1').get('location')
             start_archive_datetime = location.start_archive_datetime()
             try:
-                archive_data = arch_rp5(start_archive_datetime, url)[0]
+                # Only first archive window is needed for preview
+                archive_data = next(
+                    arch_rp5(start_archive_datetime, url, workers=1))[0]
                 context.update({'archive_data': archive_data})
 
             except Exception as e: